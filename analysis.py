@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+# Computations shared by the Streamlit app (main.py) and the headless batch runner (batch.py).
+# Nothing in here, nor in the modules built on it for both of them (buckets.py, validator.py), may import streamlit.
+
+PERFORMANCE_CATEGORIES = ['Not Occupied', 'Planned Stoppages', 'Production Time', 'Unplanned Stoppages']
+
+TIME_FACTORS = {
+    'Seconds': 1,
+    'Hours': 1/3600,
+    'Days': 1/(3600*24),
+}
+
+
+def duration_seconds(df):
+    # Loaded frames carry the precomputed 'Duration Seconds' column; anything else computes it here
+    if 'Duration Seconds' in df:
+        return df['Duration Seconds']
+    return (df['End Datetime'] - df['Start Datetime']).dt.total_seconds()
+
+
+def add_duration(df, duration_type):
+    df['Duration'] = TIME_FACTORS[duration_type]*duration_seconds(df)
+    return df
+
+
+def format_duration(durations):
+    # Vectorized over a Series of timedeltas; events longer than a day keep their whole days
+    total_seconds = durations.dt.total_seconds().round().astype("int64")
+    days = total_seconds // 86400
+    hours = (total_seconds % 86400) // 3600
+    minutes = (total_seconds % 3600) // 60
+    seconds = total_seconds % 60
+    clock = (hours.astype(str).str.zfill(2) + ":" +
+             minutes.astype(str).str.zfill(2) + ":" +
+             seconds.astype(str).str.zfill(2))
+    return clock.where(days == 0, days.astype(str) + "d " + clock)
+
+
+# Columns needed by the timelines, renamed where the chart expects a different label
+TIMELINE_COLUMNS = {
+    'Original Equipment': 'Original Equipment',
+    'Reclassified Equipment': 'Reclassified Equipment',
+    'Original Category': 'Category',
+    'Original Sub Category': 'Original Sub Category',
+    'Reclassified Category': 'Reclassified Category',
+    'Reclassified Sub Category': 'Reclassified Sub Category',
+    'Start Datetime': 'Start Datetime',
+    'End Datetime': 'End Datetime',
+    'PLC Code': 'PLC Code',
+    'Reclassified Reason': 'Reclassified Reason',
+    'Original Reason': 'Original Reason',
+}
+
+
+def prepare_timeline_data(filtered_df):
+    # Built once per rerun and shared by the Original and Reclassified timelines
+    df_plot = filtered_df[list(TIMELINE_COLUMNS)].rename(columns=TIMELINE_COLUMNS)
+    df_plot['Duration'] = format_duration(df_plot['End Datetime'] - df_plot['Start Datetime'])
+    return df_plot
+
+
+def comparable_values(series):
+    # Categorical columns are compared by their integer codes instead of the strings behind them
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    return series.to_numpy()
+
+
+def split_events(starts, ends, edges):
+    # Returns, for every piece of an event inside one bucket, the event position, the bucket and its seconds;
+    # time before the first edge or after the last one is left out
+    first = np.maximum(np.searchsorted(edges, starts, side='right') - 1, 0)
+    last = np.minimum(np.searchsorted(edges, ends, side='left') - 1, len(edges) - 2)
+    pieces = np.maximum(last - first + 1, 0)
+
+    event = np.repeat(np.arange(len(starts)), pieces)
+    # Bucket of each piece: the event's first bucket plus the piece's index within the event
+    offsets = np.arange(len(event)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    bucket = first[event] + offsets
+
+    piece_starts = np.maximum(starts[event], edges[bucket])
+    piece_ends = np.minimum(ends[event], edges[bucket + 1])
+    seconds = (piece_ends - piece_starts) / np.timedelta64(1, 's')
+    return event, bucket, seconds
+
+
+def merge_timeline_events(df_plot, y_axis, colour, window_start, window_end, pixels):
+    # Each equipment row is cut into pixel columns and every column shows the category with the most time in it;
+    # neighbouring columns with the same category become one segment, so there are at most equipment x pixels
+    # Events without a category are left out, as px.timeline leaves them out at full resolution; kept in, their
+    # factorize code -1 would be read as the last category
+    events = df_plot[[y_axis, colour, 'Start Datetime', 'End Datetime']].dropna()
+    equipment, equipment_values = pd.factorize(events[y_axis])
+    category, category_values = pd.factorize(events[colour])
+    starts = events['Start Datetime'].to_numpy().astype('datetime64[ns]')
+    ends = events['End Datetime'].to_numpy().astype('datetime64[ns]')
+
+    # Pixel columns span the window, widened if an event reaches outside it
+    first = pd.Timestamp(window_start).as_unit('ns').value
+    last = pd.Timestamp(window_end).as_unit('ns').value
+    if len(events):
+        first = min(first, starts.min().astype('int64'))
+        last = max(last, ends.max().astype('int64'))
+    edges = np.linspace(first, last, pixels + 1).round().astype('int64')
+    edges[0], edges[-1] = first, last
+    edges = edges.astype('datetime64[ns]')
+
+    event, pixel, seconds = split_events(starts, ends, edges)
+    pieces = pd.DataFrame({'equipment': equipment[event], 'pixel': pixel, 'category': category[event],
+                           'seconds': seconds,
+                           # Counted once per event, in the column it starts in
+                           'starts': np.r_[True, event[1:] != event[:-1]] if len(event) else np.zeros(0, dtype=bool),
+                           'piece_start': np.maximum(starts[event], edges[pixel]),
+                           'piece_end': np.minimum(ends[event], edges[pixel + 1])})
+
+    columns = pieces.groupby(['equipment', 'pixel'], sort=True).agg(start=('piece_start', 'min'),
+                                                                    end=('piece_end', 'max'),
+                                                                    events=('starts', 'sum'))
+    per_category = pieces.groupby(['equipment', 'pixel', 'category'], sort=False)['seconds'].sum().reset_index()
+    dominant = (per_category.sort_values('seconds', ascending=False, kind='stable')
+                .drop_duplicates(['equipment', 'pixel'])
+                .set_index(['equipment', 'pixel']))
+    columns = columns.join(dominant).reset_index()
+
+    # A new segment starts on a change of equipment or category, or after an empty pixel column
+    new_segment = np.ones(len(columns), dtype=bool)
+    new_segment[1:] = ((columns['equipment'].to_numpy()[1:] != columns['equipment'].to_numpy()[:-1]) |
+                       (columns['category'].to_numpy()[1:] != columns['category'].to_numpy()[:-1]) |
+                       (columns['pixel'].to_numpy()[1:] != columns['pixel'].to_numpy()[:-1] + 1))
+    grouped = columns.groupby(np.cumsum(new_segment), sort=False)
+    merged = grouped.agg(equipment=('equipment', 'first'), category=('category', 'first'),
+                         start=('start', 'min'), end=('end', 'max'),
+                         events=('events', 'sum'), seconds=('seconds', 'sum'))
+    return pd.DataFrame({y_axis: equipment_values.take(merged['equipment'].to_numpy()),
+                         colour: category_values.take(merged['category'].to_numpy()),
+                         'Start Datetime': merged['start'].to_numpy(),
+                         'End Datetime': merged['end'].to_numpy(),
+                         'Events': merged['events'].to_numpy(),
+                         'Event Seconds': merged['seconds'].to_numpy()})
+
+
+def pareto_table(df, category_column, value_column):
+    # Group data by category and sum the duration
+    df_grouped = df.groupby(category_column, observed=True)[value_column].sum().reset_index()
+
+    # Sort categories based on the sum of duration (stable, so ties keep the same order on every run)
+    df_sorted = df_grouped.sort_values(by=value_column, ascending=False, kind='stable')
+
+    # Calculate cumulative percentage
+    df_sorted["cumulative_percentage"] = (df_sorted[value_column].cumsum() / df_sorted[value_column].sum()) * 100
+    return df_sorted
+
+
+def gap_table(df, category_column1, category_column2, value_column):
+    # Total per performance category before and after reclassification, missing categories count as 0
+    original = df.groupby(category_column1, observed=True)[value_column].sum().reindex(PERFORMANCE_CATEGORIES, fill_value=0)
+    reclassified = df.groupby(category_column2, observed=True)[value_column].sum().reindex(PERFORMANCE_CATEGORIES, fill_value=0)
+    merged_df = pd.DataFrame({'Category': PERFORMANCE_CATEGORIES,
+                              'Original': original.to_numpy(),
+                              'Reclassified': reclassified.to_numpy()})
+    merged_df['Gap'] = merged_df['Reclassified'] - merged_df['Original']
+    return merged_df.sort_values(by='Gap', ascending=False, kind='stable')
+
+
+def add_total_row(merged_df):
+    total_sum = merged_df.sum(numeric_only=True)
+    total_row = pd.DataFrame({'Category': ['Total'], 'Original': [total_sum['Original']], 'Reclassified': [total_sum['Reclassified']], 'Gap': [total_sum['Gap']]})
+    return pd.concat([merged_df, total_row]).reset_index(drop=True)
+
+
+def equipment_summary(df, value_column):
+    # One row per equipment with its total per performance category, before and after reclassification
+    original = df.pivot_table(index='Original Equipment', columns='Original Category', values=value_column,
+                              aggfunc='sum', fill_value=0, observed=True)
+    reclassified = df.pivot_table(index='Reclassified Equipment', columns='Reclassified Category', values=value_column,
+                                  aggfunc='sum', fill_value=0, observed=True)
+    summary = original.add_prefix('Original ').join(reclassified.add_prefix('Reclassified '), how='outer').fillna(0)
+    summary.index.name = 'Equipment'
+    summary.columns.name = None
+    return summary.sort_index().reset_index()
@@ -0,0 +1,113 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import data_cache
+from analysis import add_duration, add_total_row, equipment_summary, gap_table, pareto_table
+from filter_engine import FilterEngine, clip_events
+from validator import validate
+
+# Headless version of the app's reclassification checks, e.g. for a nightly compliance run:
+#   python batch.py exports/ results/ --workers 4 --format csv
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+
+
+def find_workbooks(input_dir):
+    # Sorted so workbooks are always processed and reported in the same order
+    return sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                  if name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith('~$'))
+
+
+def select_events(df, start=None, end=None, clip=False):
+    # Same filter engine as the app, with every category and equipment selected
+    engine = FilterEngine(df)
+    start = start or engine.df['Start Datetime'].min()
+    end = end or engine.df['End Datetime'].max()
+    equipment = set(engine.equipment)
+    selected = engine.frame(engine.select('Original Category', set(engine.categories), start, end, equipment, clip))
+    return clip_events(selected, start, end) if clip else selected
+
+
+def write_table(df, path, output_format):
+    if output_format == 'parquet':
+        df.to_parquet(f"{path}.parquet", index=False)
+    else:
+        df.to_csv(f"{path}.csv", index=False)
+
+
+def analyze_workbook(path, output_dir, output_format, duration_type, start=None, end=None, clip=False,
+                     min_gap=None):
+    with open(path, 'rb') as file:
+        df = data_cache.load_workbook(file.read())
+    filtered_df = add_duration(select_events(df, start, end, clip), duration_type)
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    workbook_dir = os.path.join(output_dir, name)
+    os.makedirs(workbook_dir, exist_ok=True)
+
+    tables = {
+        'gap_table': add_total_row(gap_table(filtered_df, 'Original Category', 'Reclassified Category', 'Duration')),
+        'pareto_original_category': pareto_table(filtered_df, 'Original Category', 'Duration'),
+        'pareto_reclassified_category': pareto_table(filtered_df, 'Reclassified Category', 'Duration'),
+        'pareto_reclassified_reason': pareto_table(filtered_df, 'Reclassified Reason', 'Duration'),
+        'equipment_summary': equipment_summary(filtered_df, 'Duration'),
+    }
+    if min_gap is not None:
+        # Overlaps and gaps per equipment, the same checks as the app's timeline validation
+        tables['timeline_issues'], tables['timeline_coverage'] = validate(filtered_df, min_gap)
+    for table_name, table in tables.items():
+        write_table(table, os.path.join(workbook_dir, table_name), output_format)
+    return {'workbook': os.path.basename(path), 'events': len(df), 'analyzed_events': len(filtered_df), 'error': ''}
+
+
+def run_batch(input_dir, output_dir, workers=None, output_format='csv', duration_type='Hours', start=None, end=None,
+              clip=False, min_gap=None):
+    workbooks = find_workbooks(input_dir)
+    results = []
+    # One workbook per worker process; results are collected in input order so the manifest is stable
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(analyze_workbook, path, output_dir, output_format, duration_type, start, end, clip,
+                                   min_gap)
+                   for path in workbooks]
+        for path, future in zip(workbooks, futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                results.append({'workbook': os.path.basename(path), 'events': 0, 'analyzed_events': 0,
+                                'error': f"{type(error).__name__}: {error}"})
+    manifest = pd.DataFrame(results, columns=['workbook', 'events', 'analyzed_events', 'error'])
+    os.makedirs(output_dir, exist_ok=True)
+    write_table(manifest, os.path.join(output_dir, 'manifest'), output_format)
+    return manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the DMO-P reclassification checks over a directory of Excel exports.")
+    parser.add_argument('input_dir', help="Directory containing the DMO Excel exports")
+    parser.add_argument('output_dir', help="Directory the result tables are written to")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--format', dest='output_format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--duration', dest='duration_type', choices=['Seconds', 'Hours', 'Days'], default='Hours')
+    parser.add_argument('--start', type=pd.Timestamp, default=None, help="Only analyze events starting at or after this time")
+    parser.add_argument('--end', type=pd.Timestamp, default=None, help="Only analyze events ending at or before this time")
+    parser.add_argument('--clip', action='store_true',
+                        help="Keep events overlapping --start/--end, trimmed to them, instead of dropping them")
+    parser.add_argument('--validate', dest='min_gap', type=float, nargs='?', const=60, default=None, metavar='MIN_GAP',
+                        help="Also write overlaps, gaps longer than MIN_GAP seconds (default 60) and coverage per equipment")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    manifest = run_batch(args.input_dir, args.output_dir, args.workers, args.output_format,
+                         args.duration_type, args.start, args.end, args.clip, args.min_gap)
+    print(manifest.to_string(index=False))
+    return 1 if (manifest['error'] != '').any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+import pyarrow.feather as feather
+
+import data_cache
+from analysis import TIME_FACTORS, add_duration, gap_table, merge_timeline_events, pareto_table, prepare_timeline_data
+from buckets import SHIFT_CALENDARS, bucket_totals
+from charts import LOD_PIXEL_WIDTH, pareto_figure, timeline_figure, waterfall_figure
+from duration_cube import DurationCube
+from filter_engine import FilterEngine
+from synthetic_data import generate_events
+from validator import validate
+
+# Times each stage of the app on synthetic data and reports throughput and peak memory per stage:
+#   python benchmark.py --sizes 10000 100000 1000000 --output bench.csv
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+class StageTimer:
+    # tracemalloc slows pandas string work down many times over, so timing and memory come from separate passes
+    def __init__(self, rows, trace_memory=False):
+        self.rows = rows
+        self.trace_memory = trace_memory
+        self.results = []
+
+    def run(self, stage, func, *args):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - started
+        row = {'rows': self.rows, 'stage': stage}
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            row['peak_mb'] = (peak - before) / (1024 * 1024)
+        else:
+            row['seconds'] = seconds
+            row['rows_per_second'] = self.rows / seconds if seconds else float('inf')
+        self.results.append(row)
+        return result
+
+
+def serialize_figures(figures):
+    return sum(len(fig.to_json()) for fig in figures)
+
+
+def benchmark_size(rows, excel_max_rows, cache_dir, seed=0, trace_memory=False):
+    df = generate_events(rows, seed=seed)
+    timer = StageTimer(rows, trace_memory)
+
+    # Excel parsing is only timed up to excel_max_rows; writing a million-row workbook takes too long
+    if rows <= excel_max_rows:
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False)
+        timer.run('load (excel parse)', data_cache.parse_workbook, io.BytesIO(buffer.getvalue()))
+
+    # Cache hit path of load_workbook: memory-mapped Arrow file
+    data_cache.CACHE_DIR = cache_dir
+    digest = f"synthetic-{rows}-{seed}"
+    os.makedirs(cache_dir, exist_ok=True)
+    feather.write_feather(data_cache.compact_frame(df), data_cache.cache_path(digest), compression="uncompressed")
+    df = timer.run('load (cache hit)', data_cache.load_workbook, b"", digest)
+
+    # Whole dataset, every category and equipment selected: the default view of the app
+    window_start = df['Start Datetime'].min()
+    window_end = df['End Datetime'].max()
+    engine = timer.run('filter (build index)', FilterEngine, df)
+    categories, equipment = set(engine.categories), set(engine.equipment)
+    selection = timer.run('filter (select)', engine.select, 'Reclassified Category', categories,
+                          window_start, window_end, equipment)
+    filtered_df = timer.run('filter (materialize)', engine.frame, selection)
+
+    timeline_df = timer.run('timeline data prep', prepare_timeline_data, filtered_df)
+    timer.run('timeline level of detail', merge_timeline_events, timeline_df, 'Original Equipment', 'Category',
+              window_start, window_end, LOD_PIXEL_WIDTH)
+
+    cube = timer.run('duration cube (build)', DurationCube, engine)
+    cube_df = timer.run('duration cube (slice)', cube.slice, 'Reclassified Category', categories,
+                        window_start, window_end, equipment, selection)
+    cube_df['Duration'] = TIME_FACTORS['Hours'] * cube_df['Seconds']
+    add_duration(filtered_df, 'Hours')
+
+    timer.run('pareto', lambda: [pareto_table(cube_df, column, 'Duration')
+                                 for column in ['Original Category', 'Reclassified Category']])
+    merged_df = timer.run('waterfall', gap_table, cube_df, 'Original Category', 'Reclassified Category', 'Duration')
+    timer.run('timeline validation', validate, filtered_df)
+    timer.run('trend buckets (shift)', bucket_totals, filtered_df, ['Original Category', 'Reclassified Category'],
+              'Shift', next(iter(SHIFT_CALENDARS.values())))
+
+    figures = timer.run('figure build', lambda: [
+        timeline_figure(timeline_df, 'Original Equipment', window_start, window_end)[0],
+        timeline_figure(timeline_df, 'Reclassified Equipment', window_start, window_end)[0],
+        pareto_figure(cube_df, 'Original Category', 'Duration', 'Hours', 'Reclassified Category'),
+        pareto_figure(cube_df, 'Reclassified Category', 'Duration', 'Hours', 'Reclassified Category'),
+        waterfall_figure(merged_df, 'Hours'),
+    ])
+    payload = timer.run('figure serialization', serialize_figures, figures)
+    timer.results[-1]['payload_mb'] = payload / (1024 * 1024)
+    return timer.results
+
+
+def run_benchmark(sizes, excel_max_rows=100_000, seed=0):
+    timings, memory = [], []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for rows in sizes:
+            timings.extend(benchmark_size(rows, excel_max_rows, cache_dir, seed))
+            tracemalloc.start()
+            try:
+                memory.extend(benchmark_size(rows, excel_max_rows, cache_dir, seed, trace_memory=True))
+            finally:
+                tracemalloc.stop()
+    memory = pd.DataFrame(memory)[['rows', 'stage', 'peak_mb']]
+    return pd.DataFrame(timings).merge(memory, on=['rows', 'stage'], how='left')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DMO-P validation stages on synthetic data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--excel-max-rows', type=int, default=100_000,
+                        help="Largest size for which Excel parsing is timed")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Optional CSV file for the results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmark(args.sizes, args.excel_max_rows, args.seed)
+    print(results.to_string(index=False, float_format=lambda value: f"{value:,.3f}"))
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
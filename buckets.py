@@ -0,0 +1,112 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from analysis import PERFORMANCE_CATEGORIES, split_events
+
+# Per shift/day/week totals: every event is split at the bucket boundaries it crosses, so an event
+# running over midnight or a shift change counts towards each bucket for the time it spent in it.
+
+GRANULARITIES = ['Shift', 'Day', 'Week']
+
+# Shift name and start time of day; shifts repeat every day and the production day starts with the first one
+SHIFT_CALENDARS = {
+    '3 shifts (06:00, 14:00, 22:00)': [('Shift 1', '06:00'), ('Shift 2', '14:00'), ('Shift 3', '22:00')],
+    '2 shifts (06:00, 18:00)': [('Day', '06:00'), ('Night', '18:00')],
+    '2 shifts (07:00, 19:00)': [('Day', '07:00'), ('Night', '19:00')],
+}
+DAY = np.timedelta64(1, 'D')
+TIME_OF_DAY = re.compile(r'(\d{2}):(\d{2})')
+
+
+def parse_calendar(spec):
+    # "Morning=06:00, Afternoon=14:00, Night=22:00" -> [('Morning', '06:00'), ...]
+    calendar = []
+    for part in spec.split(','):
+        name, _, start = part.partition('=')
+        if not name.strip() or not TIME_OF_DAY.fullmatch(start.strip()):
+            raise ValueError(f"Expected name=HH:MM, got {part.strip()!r}")
+        calendar.append((name.strip(), start.strip()))
+    return calendar
+
+
+def time_of_day(start):
+    # "HH:MM" as an offset from midnight, which has to lie within the day
+    match = TIME_OF_DAY.fullmatch(start)
+    if not match or int(match[1]) >= 24 or int(match[2]) >= 60:
+        raise ValueError(f"Expected a shift start between 00:00 and 23:59, got {start!r}")
+    return np.timedelta64(int(match[1]) * 60 + int(match[2]), 'm').astype('timedelta64[ns]')
+
+
+def shift_offsets(calendar):
+    # Start of each shift as an offset from midnight, sorted, with the names in the same order
+    offsets = np.array([time_of_day(start) for _, start in calendar], dtype='timedelta64[ns]')
+    if len(offsets) == 0:
+        raise ValueError("A shift calendar needs at least one shift")
+    if len(np.unique(offsets)) < len(offsets):
+        raise ValueError("Every shift in a calendar needs its own start time")
+    order = np.argsort(offsets, kind='stable')
+    names = [calendar[i][0] for i in order]
+    return names, offsets[order]
+
+
+def bucket_edges(first, last, granularity, calendar):
+    # Sorted bucket boundaries covering [first, last] and a label for each bucket between two boundaries
+    names, offsets = shift_offsets(calendar)
+    first, last = pd.Timestamp(first), pd.Timestamp(last)
+    day_start = offsets[0]
+    base = ((first - pd.Timedelta(day_start)).normalize() + pd.Timedelta(day_start)).to_datetime64().astype('datetime64[ns]')
+
+    if granularity == 'Week':
+        # Production weeks start on Monday at the start of the first shift
+        base = base - int(pd.Timestamp(base).weekday()) * DAY
+        step = 7 * DAY
+    else:
+        step = DAY
+    periods = max(1, int(np.ceil((last.to_datetime64() - base) / step)))
+    period_starts = base + np.arange(periods + 1) * step
+
+    if granularity == 'Shift':
+        within_day = offsets - day_start
+        edges = np.append((period_starts[:-1, None] + within_day[None, :]).ravel(), period_starts[-1])
+        days = np.datetime_as_string(np.repeat(period_starts[:-1], len(names)), unit='D')
+        labels = [f"{day} {name}" for day, name in zip(days, names * periods)]
+    elif granularity == 'Week':
+        edges = period_starts
+        labels = [f"Week of {day}" for day in np.datetime_as_string(period_starts[:-1], unit='D')]
+    else:
+        edges = period_starts
+        labels = list(np.datetime_as_string(period_starts[:-1], unit='D'))
+    return edges, labels
+
+
+def bucket_totals(df, category_columns, granularity, calendar):
+    # One table per category column: seconds per bucket and performance category, in time order
+    starts = df['Start Datetime'].to_numpy().astype('datetime64[ns]')
+    ends = df['End Datetime'].to_numpy().astype('datetime64[ns]')
+    tables = {}
+    if len(df) == 0:
+        for column in category_columns:
+            tables[column] = pd.DataFrame(columns=['Bucket Start', 'Bucket', column, 'Seconds'])
+        return tables
+
+    edges, labels = bucket_edges(starts.min(), ends.max(), granularity, calendar)
+    event, bucket, seconds = split_events(starts, ends, edges)
+    for column in category_columns:
+        pieces = pd.DataFrame({'bucket': bucket, column: df[column].array.take(event), 'Seconds': seconds})
+        totals = pieces.groupby(['bucket', column], observed=True, sort=True)['Seconds'].sum().reset_index()
+        totals.insert(0, 'Bucket Start', edges[totals['bucket'].to_numpy()])
+        totals.insert(1, 'Bucket', np.asarray(labels, dtype=object)[totals['bucket'].to_numpy()])
+        tables[column] = totals.drop(columns='bucket')
+    return tables
+
+
+def trend_table(totals, category_column, value_column='Seconds'):
+    # Buckets as rows and performance categories as columns, the shape of a stacked bar chart
+    table = totals.pivot_table(index=['Bucket Start', 'Bucket'], columns=category_column, values=value_column,
+                               aggfunc='sum', fill_value=0, observed=True)
+    ordered = [category for category in PERFORMANCE_CATEGORIES if category in table.columns]
+    table = table[ordered + [category for category in table.columns if category not in ordered]]
+    table.columns.name = None
+    return table.reset_index()
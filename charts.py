@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objs as go
+
+from analysis import format_duration, merge_timeline_events, pareto_table
+
+# Plotly figures drawn by the app, built without Streamlit so they can also be benchmarked and cached
+
+# Level of detail: windows wider than LOD_RAW_WINDOW are drawn as one bar per run of pixel columns
+LOD_PIXEL_WIDTH = 1300
+LOD_RAW_WINDOW = pd.Timedelta(hours=24)
+
+def create_lod_figure(merged, y_axis, colour, category_colors):
+    fig = go.Figure()
+    bar_width = max(2, min(20, 250 // max(merged[y_axis].nunique(), 1)))
+    for category, segments in merged.groupby(colour, sort=False, observed=True):
+        # Each segment is a start/end pair followed by a NaN gap, all in one WebGL trace per category; x is epoch ms
+        # and the hover is built in the browser from customdata, so the arrays go out as compact typed arrays
+        n = len(segments)
+        x = np.full(3 * n, np.nan)
+        x[0::3] = segments['Start Datetime'].to_numpy().astype('datetime64[ms]').astype('int64')
+        x[1::3] = segments['End Datetime'].to_numpy().astype('datetime64[ms]').astype('int64')
+        y = np.full(3 * n, None, dtype=object)
+        y[0::3] = segments[y_axis].astype(str).to_numpy()
+        y[1::3] = y[0::3]
+        customdata = np.full((3 * n, 2), np.nan)
+        customdata[0::3] = np.column_stack([segments['Events'].to_numpy(), segments['Event Seconds'].to_numpy() / 3600])
+        customdata[1::3] = customdata[0::3]
+        fig.add_trace(go.Scattergl(x=x, y=y, customdata=customdata, mode="lines", name=str(category),
+                                   line=dict(color=category_colors.get(category, "blue"), width=bar_width),
+                                   hovertemplate="%{y}<br>" + str(category) + "<br>Events starting: %{customdata[0]:.0f}"
+                                                 "<br>Event time: %{customdata[1]:.2f} h<extra></extra>"))
+    fig.update_xaxes(type="date")
+    return fig
+
+# Regions found by validator.py, drawn over the events of the equipment they belong to
+ISSUE_COLORS = {"Overlap": "magenta", "Gap": "black"}
+
+def add_issue_regions(fig, issues, y_axis):
+    for issue, regions in issues.groupby('Issue', sort=False):
+        # Same start/end/None layout as the level-of-detail segments, one WebGL trace per kind of issue
+        n = len(regions)
+        x = np.full(3 * n, None, dtype=object)
+        x[0::3] = np.datetime_as_string(regions['Start Datetime'].to_numpy(), unit='s')
+        x[1::3] = np.datetime_as_string(regions['End Datetime'].to_numpy(), unit='s')
+        y = np.full(3 * n, None, dtype=object)
+        y[0::3] = regions['Equipment'].to_numpy()
+        y[1::3] = regions['Equipment'].to_numpy()
+        hover = (f"{issue}<br>" + regions['Equipment'].astype(str) + "<br>" +
+                 format_duration(regions['End Datetime'] - regions['Start Datetime'])).to_numpy()
+        text = np.full(3 * n, None, dtype=object)
+        text[0::3] = hover
+        text[1::3] = hover
+        fig.add_trace(go.Scattergl(x=x, y=y, text=text, hoverinfo="text", mode="lines", name=f"{issue} ({y_axis})",
+                                   opacity=0.6, line=dict(color=ISSUE_COLORS.get(issue, "blue"), width=6)))
+    return fig
+
+def timeline_figure(df_plot, y_axis, window_start, window_end, full_resolution=False, issues=None):
+    # Returns the figure and, when the level-of-detail path was used, the merged segments
+    # Create a list of colors corresponding to each category
+    category_colors = {
+        "Production Time": "green",
+        "Unplanned Stoppages": "red",
+        "Not Occupied": "grey",
+        "Planned Stoppages": "yellow"
+    }
+
+    if y_axis == "Original Equipment":
+        colour = "Category"
+        sub_cat = "Original Sub Category"
+        reason = "Original Reason"
+    else:
+        colour = 'Reclassified Category'
+        sub_cat = 'Reclassified Sub Category'
+        reason = 'Reclassified Reason'
+
+    merged = None
+    window = pd.Timestamp(window_end) - pd.Timestamp(window_start)
+    if full_resolution or window <= LOD_RAW_WINDOW:
+        # Plot the graph using Plotly Express
+        fig = px.timeline(df_plot, x_start="Start Datetime", x_end="End Datetime", y=y_axis,
+                          color=colour, color_discrete_map=category_colors,
+                          hover_data={sub_cat: True,
+                                      "Start Datetime": "|%Y-%m-%d %H:%M:%S",
+                                      "End Datetime": "|%Y-%m-%d %H:%M:%S",
+                                      "Duration": True,
+                                      "PLC Code": True,
+                                      reason: True})
+    else:
+        merged = merge_timeline_events(df_plot, y_axis, colour, window_start, window_end, LOD_PIXEL_WIDTH)
+        fig = create_lod_figure(merged, y_axis, colour, category_colors)
+    if issues is not None and len(issues):
+        add_issue_regions(fig, issues, y_axis)
+    fig.update_yaxes(categoryorder="category ascending")
+    fig.update_layout(title=f"🕔 Duration of {y_axis}",
+                      xaxis_title="Datetime",
+                      yaxis_title=y_axis,
+                      width=1300,
+                      height=400)
+    return fig, merged
+
+
+def pareto_figure(df, category_column, value_column, duration_type, avail_cat):
+    # Define category colors
+    color_catalogue = {
+        "Production Time": "green",
+        "Unplanned Stoppages": "red",
+        "Not Occupied": "grey",
+        "Planned Stoppages": "yellow"
+    }
+    if len(df[avail_cat].unique()) == 1:
+        category_colors = {}
+        category_col = df[avail_cat].unique()[0]
+        category_colors[category_col] = color_catalogue.get(category_col)
+    else:
+        category_colors = color_catalogue
+        
+    # Group data by category, sort by the summed duration and add the cumulative percentage
+    df_sorted = pareto_table(df, category_column, value_column)
+
+    # Plot Pareto diagram
+    fig = go.Figure()
+
+    # Add bars for frequencies with text outside the bars
+    if len(df[avail_cat].unique()) == 1:
+        fig.add_trace(go.Bar(
+            x=df_sorted[category_column],
+            y=df_sorted[value_column],
+            name='Hours',
+            text=df_sorted[value_column].round(2),  # Round the values to two decimal places
+            textposition='outside',  # Display text outside the bars
+            marker_color=list(category_colors.values())[0]
+        ))
+    else:
+        fig.add_trace(go.Bar(
+            x=df_sorted[category_column],
+            y=df_sorted[value_column],
+            name='Hours',
+            text=df_sorted[value_column].round(2),  # Round the values to two decimal places
+            textposition='outside',  # Display text outside the bars
+            marker_color=[category_colors.get(category, "blue") for category in df_sorted[category_column]]  # Set bar colors based on category
+        ))
+
+    # Add the cumulative percentage line
+    fig.add_trace(go.Scatter(
+        x=df_sorted[category_column],
+        y=df_sorted['cumulative_percentage'],
+        name='Cumulative Percentage',
+        line=dict(color="navy"),
+        yaxis='y2'  # Secondary y-axis
+    ))
+
+    # Update the layout
+    fig.update_layout(
+        title=f"✅ {df[avail_cat].unique()[0] if len(df[avail_cat].unique()) == 1 else category_column} Pareto Diagram",
+        height=500,
+        yaxis=dict(
+            title=duration_type
+        ),
+        yaxis2=dict(
+            title='Cumulative Percentage (%)',
+            overlaying='y',
+            side='right'
+        ),
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        )
+    )
+    return fig
+
+def pareto_with_colors_figure(df, category_column, value_column, duration_type, paretoed_param, color_column):
+    # Define category colors
+    color_catalogue = {
+        "Production Time": "green",
+        "Unplanned Stoppages": "red",
+        "Not Occupied": "grey",
+        "Planned Stoppages": "yellow"
+    }
+
+    # Group data by category, sort by the summed duration and add the cumulative percentage
+    df_sorted = pareto_table(df, category_column, value_column)
+
+    # If color_column is provided, assign colors dynamically based on its values
+    if color_column:
+        # Colour of each bar comes from the first row of its category, looked up in one pass
+        first_values = df.groupby(category_column, observed=True, sort=False)[color_column].first().astype(object)
+        bar_colors = df_sorted[category_column].map(first_values).map(color_catalogue).fillna("blue").tolist()
+    else:
+        # Use default color for all bars if color_column is not provided
+        default_color = "blue"
+        bar_colors = [default_color] * len(df_sorted)
+
+    # Plot Pareto diagram
+    fig = go.Figure()
+
+    # Add bars for frequencies with text outside the bars
+    fig.add_trace(go.Bar(
+        x=df_sorted[category_column],
+        y=df_sorted[value_column],
+        name='Hours',
+        text=df_sorted[value_column].round(2),  # Round the values to two decimal places
+        textposition='outside',  # Display text outside the bars
+        marker_color=bar_colors  # Set bar colors based on category
+    ))
+
+    # Add the cumulative percentage line
+    fig.add_trace(go.Scatter(
+        x=df_sorted[category_column],
+        y=df_sorted['cumulative_percentage'],
+        name='Cumulative Percentage',
+        line=dict(color="navy"),
+        yaxis='y2'  # Secondary y-axis
+    ))
+
+    # Update the layout
+    fig.update_layout(
+        title=f"📇 {paretoed_param} Pareto Diagram",
+        height=500,
+        yaxis=dict(
+            title=duration_type
+        ),
+        yaxis2=dict(
+            title='Cumulative Percentage (%)',
+            overlaying='y',
+            side='right'
+        ),
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        )
+    )
+
+    return fig
+
+def waterfall_figure(merged_df, duration_type):
+    #categories = list(['Ref']) + merged_df['Category'].tolist()
+    #values = list([sum(merged_df['Reclassified'].tolist())]) + merged_df['Gap'].tolist()
+
+    categories = merged_df['Category'].tolist()
+    values = merged_df['Gap'].tolist()
+    values = [round(num, 2) for num in values]
+    
+    fig = go.Figure(go.Waterfall(
+        x=categories,
+        y=values,
+        measure=["relative" if val != 1 else "total" for val in values],  # Different measure for each bar
+        base=-10,  # Set the base to 100
+        increasing=dict(marker=dict(color="green")),  # Set color for increasing values
+        decreasing=dict(marker=dict(color="red")),  # Set color for decreasing values
+        connector=dict(line=dict(color="grey", width=2)),  # Customize connector line
+        text=values,  # Custom text for each bar
+        #text=[0] + [values[i] - values[i - 1] for i in range(1, len(values))],  # Custom text for each bar
+        textposition="outside",  # Set text position outside the bars
+        hoverinfo="y+text",  # Display y value and custom text on hover
+    ))
+    # Update layout
+    fig.update_layout(
+        title='📈 Gap Analysis with Waterfall Graph',
+        yaxis=dict(title=duration_type),
+        xaxis=dict(title='Category'),
+        showlegend=True,
+        height=500
+    )
+    return fig
+
+def trend_figure(table, category_column, duration_type, granularity):
+    # Stacked bars per shift/day/week; table comes from buckets.trend_table with values in duration_type
+    color_catalogue = {
+        "Production Time": "green",
+        "Unplanned Stoppages": "red",
+        "Not Occupied": "grey",
+        "Planned Stoppages": "yellow"
+    }
+    fig = go.Figure()
+    for category in table.columns.drop(['Bucket Start', 'Bucket']):
+        fig.add_trace(go.Bar(
+            x=table['Bucket'],
+            y=table[category].round(2),
+            name=str(category),
+            marker_color=color_catalogue.get(category, "blue")
+        ))
+    fig.update_layout(
+        title=f"📊 {category_column} per {granularity}",
+        barmode='stack',
+        yaxis=dict(title=duration_type),
+        xaxis=dict(title=granularity, type='category'),
+        height=500,
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        )
+    )
+    return fig
@@ -0,0 +1,195 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+# Parsed workbooks are stored as Arrow (Feather) files named after the hash of the uploaded bytes,
+# so the same monthly export is only parsed by openpyxl once
+CACHE_DIR = os.environ.get("DMO_CACHE_DIR", ".dmo_cache")
+CACHE_MAX_BYTES = int(os.environ.get("DMO_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Bump whenever parse_workbook changes what it stores, so stale cache files are not reused
+CACHE_VERSION = 2
+
+cache_stats = {"hits": 0, "misses": 0}
+
+# Original/Reclassified column pairs share one category dictionary, so their codes are directly comparable
+CATEGORICAL_PAIRS = [
+    ('Original Equipment', 'Reclassified Equipment'),
+    ('Original Category', 'Reclassified Category'),
+    ('Original Sub Category', 'Reclassified Sub Category'),
+    ('Original Reason', 'Reclassified Reason'),
+]
+# Added by the loader for the app's own use (see compact_frame and combine_workbooks), not columns of the export
+INTERNAL_COLUMNS = ['Duration Seconds', 'Source']
+# Other text columns become categorical when at most this share of their values is distinct
+CATEGORICAL_MAX_UNIQUE_SHARE = 0.5
+
+
+def file_digest(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def parse_workbook(file):
+    df = pd.read_excel(file)
+    # Convert 'Start Datetime' and 'End Datetime' columns to datetime
+    df['Start Datetime'] = pd.to_datetime(df['Start Datetime'])
+    df['End Datetime'] = pd.to_datetime(df['End Datetime'])
+    # Arrow needs one type per column, so mixed columns (e.g. numeric and text PLC codes) become strings
+    for column in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[column], skipna=True).startswith("mixed"):
+            df[column] = df[column].astype("string")
+    df.attrs['loaded_bytes'] = int(df.memory_usage(deep=True, index=False).sum())
+    return compact_frame(df)
+
+
+def is_text(series):
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def union_dtype(columns):
+    categories = pd.Index(pd.concat(columns, ignore_index=True).dropna().unique())
+    # Sorted like astype('category') would, so sorting the categorical matches sorting the text
+    try:
+        categories = categories.sort_values()
+    except TypeError:
+        pass
+    return pd.CategoricalDtype(categories)
+
+
+def share_dictionaries(df):
+    for pair in CATEGORICAL_PAIRS:
+        columns = [column for column in pair if column in df]
+        if columns:
+            dtype = union_dtype([df[column] for column in columns])
+            for column in columns:
+                df[column] = df[column].astype(dtype)
+    return df
+
+
+def compact_frame(df):
+    # Repeated text becomes categorical and the event duration is stored once as a number
+    df = share_dictionaries(df)
+    for column in df.columns:
+        if is_text(df[column]) and df[column].nunique() <= CATEGORICAL_MAX_UNIQUE_SHARE * len(df):
+            df[column] = df[column].astype('category')
+    df['Duration Seconds'] = (df['End Datetime'] - df['Start Datetime']).dt.total_seconds()
+    return df
+
+
+def memory_report(df):
+    # Memory of the frame as pd.read_excel returned it (kept in attrs, which survive the Arrow cache) and now
+    return df.attrs.get('loaded_bytes'), int(df.memory_usage(deep=True, index=False).sum())
+
+
+def cache_path(digest):
+    return os.path.join(CACHE_DIR, f"{digest}.v{CACHE_VERSION}.arrow")
+
+
+def load_workbook(file_bytes, digest=None):
+    digest = digest or file_digest(file_bytes)
+    path = cache_path(digest)
+
+    if os.path.exists(path):
+        try:
+            # Touch the file so eviction treats it as recently used
+            os.utime(path)
+            df = feather.read_table(path, memory_map=True).to_pandas()
+            cache_stats["hits"] += 1
+            return df
+        except FileNotFoundError:
+            # Evicted by another session or worker process since the check above; parsed again below
+            pass
+
+    cache_stats["misses"] += 1
+    df = parse_workbook(io.BytesIO(file_bytes))
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write to a temporary file first so a concurrent reader never sees a half-written cache entry;
+    # named per process and thread, since Streamlit sessions are threads of one process
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Stored uncompressed so reads can memory-map the columns instead of decoding them
+    feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    evict(CACHE_MAX_BYTES)
+    return df
+
+
+def load_workbooks(files, workers=None):
+    # files is a list of (name, bytes); every workbook is cached on its own, so only new files get parsed
+    digests = [file_digest(file_bytes) for _, file_bytes in files]
+    frames = [None] * len(files)
+    missing = [i for i, digest in enumerate(digests) if not os.path.exists(cache_path(digest))]
+
+    if len(missing) > 1:
+        # openpyxl parsing is CPU bound, so uncached workbooks are parsed in separate processes
+        workers = min(workers or os.cpu_count() or 1, len(missing))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            parsed = executor.map(load_workbook, [files[i][1] for i in missing], [digests[i] for i in missing])
+            for i, df in zip(missing, parsed):
+                frames[i] = df
+        cache_stats["misses"] += len(missing)
+
+    for i, (_, file_bytes) in enumerate(files):
+        if frames[i] is None:
+            frames[i] = load_workbook(file_bytes, digests[i])
+    return combine_workbooks(frames, [name for name, _ in files])
+
+
+def combine_workbooks(frames, sources):
+    # Categorical columns get one shared set of categories so the concatenation stays categorical
+    for column in set().union(*(df.columns for df in frames)):
+        if any(isinstance(df[column].dtype, pd.CategoricalDtype) for df in frames if column in df):
+            dtype = union_dtype([df[column] for df in frames if column in df])
+            frames = [df.assign(**{column: df[column].astype(dtype)}) if column in df else df for df in frames]
+
+    # Tag every event with the workbook it came from
+    source_dtype = pd.CategoricalDtype(list(dict.fromkeys(sources)))
+    tagged = [df.assign(Source=pd.Categorical.from_codes(np.full(len(df), source_dtype.categories.get_loc(source)),
+                                                         dtype=source_dtype))
+              for df, source in zip(frames, sources)]
+    # Per-column unions can leave an Original/Reclassified pair with different dictionaries, so re-share them
+    combined = share_dictionaries(pd.concat(tagged, ignore_index=True))
+    combined.attrs['loaded_bytes'] = sum(df.attrs.get('loaded_bytes', 0) for df in frames)
+    return combined
+
+
+def cache_entries():
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".arrow"):
+            try:
+                stat = os.stat(os.path.join(CACHE_DIR, name))
+            except FileNotFoundError:
+                # Removed by a concurrent eviction since the listing
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    return entries
+
+
+def evict(max_bytes):
+    # Drop least recently used entries until the cache directory fits in max_bytes
+    entries = sorted(cache_entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            # Another process evicted it first
+            pass
+        total -= size
+
+
+def cache_size():
+    entries = cache_entries()
+    return len(entries), sum(size for _, size, _ in entries)
@@ -0,0 +1,90 @@
+import numpy as np
+
+from analysis import split_events
+from filter_engine import to_datetime64
+
+CUBE_DIMENSIONS = [
+    'Original Equipment', 'Reclassified Equipment',
+    'Original Category', 'Reclassified Category',
+    'Original Sub Category', 'Reclassified Sub Category',
+    'Original Reason', 'Reclassified Reason',
+]
+HOUR = np.timedelta64(1, 'h')
+
+
+def overlap_seconds(starts, ends, start, end):
+    return np.maximum(np.minimum(ends, end) - np.maximum(starts, start), np.timedelta64(0, 'ns')) / np.timedelta64(1, 's')
+
+
+class DurationCube:
+    # Every event is split at the hour boundaries it crosses and its seconds are summed per hour and dimension
+    # combination (an integer code), so slicing a window is a bincount over the hours lying inside it
+    def __init__(self, engine):
+        self.engine = engine
+        df = engine.df
+        combo = df[CUBE_DIMENSIONS].groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False).ngroup()
+        self.event_combo = combo.to_numpy().astype(np.int64)
+        first_rows = combo.drop_duplicates().index.to_numpy()
+        self.combos = df[CUBE_DIMENSIONS].take(first_rows).reset_index(drop=True)
+
+        valid = np.flatnonzero(~np.isnat(engine.starts) & ~np.isnat(engine.ends))
+        starts, ends = engine.starts[valid], engine.ends[valid]
+        if len(valid):
+            first = starts.min().astype('datetime64[h]').astype('datetime64[ns]')
+            self.edges = np.arange(first, ends.max() + HOUR, HOUR).astype('datetime64[ns]')
+        else:
+            self.edges = np.array([], dtype='datetime64[ns]')
+        event, hour, seconds = split_events(starts, ends, self.edges)
+
+        # One row per (hour, combination) that has any time, sorted by hour
+        keys, inverse = np.unique(hour * len(self.combos) + self.event_combo[valid[event]], return_inverse=True)
+        self.hour = keys // max(len(self.combos), 1)
+        self.combo = keys % max(len(self.combos), 1)
+        self.seconds = np.bincount(inverse, weights=seconds, minlength=len(keys))
+
+    def edge_seconds(self, category_column, selected_categories, selected_equipment, start, end, window, clip):
+        # Seconds per combination of the selected events in [start, end), a partial hour at a window edge
+        positions = self.engine.search(category_column, selected_categories, start, end, selected_equipment, clip=True)
+        starts, ends = self.engine.starts[positions], self.engine.ends[positions]
+        seconds = overlap_seconds(starts, ends, start, end)
+        if not clip:
+            seconds = seconds * ((starts >= window[0]) & (ends <= window[1]))
+        return np.bincount(self.event_combo[positions], weights=seconds, minlength=len(self.combos))
+
+    def slice(self, category_column, selected_categories, start, end, selected_equipment, selection, clip=False):
+        start, end = to_datetime64(start), to_datetime64(end)
+        totals = np.zeros(len(self.combos))
+        if len(self.edges) == 0:
+            return self.combos.iloc[:0].assign(Seconds=totals[:0])
+
+        # Whole hours inside the window come from the cube; the partial hours at its edges from the events
+        first_hour = np.searchsorted(self.edges, start, side='left')
+        last_hour = min(np.searchsorted(self.edges, end, side='right') - 1, len(self.edges) - 1)
+        if first_hour < last_hour:
+            lo, hi = np.searchsorted(self.hour, [first_hour, last_hour], side='left')
+            totals += np.bincount(self.combo[lo:hi], weights=self.seconds[lo:hi], minlength=len(self.combos))
+            interior_start, interior_end = self.edges[first_hour], self.edges[last_hour]
+        else:
+            interior_start = interior_end = end
+
+        if not clip:
+            # Only events lying entirely inside the window count, so events crossing its bounds give back
+            # whatever time they had in the whole hours
+            for bound in [start, end]:
+                # Overlapping the empty window [bound, bound] means starting before the bound and ending after it
+                crossing = self.engine.search(category_column, selected_categories, bound, bound,
+                                              selected_equipment, clip=True)
+                if bound == end:
+                    crossing = crossing[self.engine.starts[crossing] >= start]
+                seconds = overlap_seconds(self.engine.starts[crossing], self.engine.ends[crossing],
+                                          interior_start, interior_end)
+                totals -= np.bincount(self.event_combo[crossing], weights=seconds, minlength=len(self.combos))
+
+        for edge_start, edge_end in [(start, interior_start), (interior_end, end)]:
+            if edge_start < edge_end:
+                totals += self.edge_seconds(category_column, selected_categories, selected_equipment,
+                                            edge_start, edge_end, (start, end), clip)
+
+        # Same combinations as grouping the selected events themselves, including ones with no time
+        present = np.bincount(self.event_combo[selection], minlength=len(self.combos)) > 0
+        return self.combos[present].reset_index(drop=True).assign(Seconds=totals[present])
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_cache import INTERNAL_COLUMNS, compact_frame
+from duration_cube import CUBE_DIMENSIONS
+
+# Every workbook loaded with "keep in the local store" is appended to one SQLite file, so months and years
+# of exports can be reopened without uploading them again. The sidebar filters run as SQL against it,
+# using the indexes on equipment and start time, and only the matching rows or totals come back to pandas.
+# Datetimes are stored as integer nanoseconds, which keeps comparisons and durations plain integer arithmetic.
+
+STORE_PATH = os.environ.get("DMO_STORE_PATH", "dmo_store.sqlite")
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS workbooks (digest TEXT PRIMARY KEY, name TEXT NOT NULL, events INTEGER NOT NULL, '
+    'first_start INTEGER, last_end INTEGER, stored_at TEXT NOT NULL)',
+    # Columns differ between exports; kind records which ones hold datetimes
+    'CREATE TABLE IF NOT EXISTS event_columns (name TEXT PRIMARY KEY, kind TEXT NOT NULL)',
+    # Distinct values of each text column per workbook, in order of first appearance, so the sidebar options
+    # are read from here instead of scanning the events on every rerun
+    'CREATE TABLE IF NOT EXISTS workbook_values (digest TEXT NOT NULL, column_name TEXT NOT NULL, '
+    'position INTEGER NOT NULL, value TEXT NOT NULL, PRIMARY KEY (digest, column_name, position))',
+    'CREATE TABLE IF NOT EXISTS events (Workbook TEXT NOT NULL, "Start Datetime" INTEGER, "End Datetime" INTEGER, '
+    '"Original Equipment" TEXT, "Reclassified Equipment" TEXT)',
+    'CREATE INDEX IF NOT EXISTS events_start ON events (Workbook, "Start Datetime")',
+    'CREATE INDEX IF NOT EXISTS events_original_equipment ON events ("Original Equipment", "Start Datetime")',
+    'CREATE INDEX IF NOT EXISTS events_reclassified_equipment ON events ("Reclassified Equipment", "Start Datetime")',
+]
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def to_nanoseconds(value):
+    return int(pd.Timestamp(value).as_unit('ns').value)
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or STORE_PATH)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def store_workbook(digest, name, df, path=None):
+    # Stores one parsed workbook once; returns False if a workbook with the same digest is already stored.
+    # BEGIN IMMEDIATE takes the write lock before the digest is looked up, so two sessions or processes storing
+    # the same workbook at once cannot both append its events; the second one waits and then finds it stored
+    with closing(connect(path)) as conn, conn:
+        conn.execute('BEGIN IMMEDIATE')
+        if conn.execute('SELECT 1 FROM workbooks WHERE digest = ?', (digest,)).fetchone():
+            return False
+
+        rows = df.drop(columns=INTERNAL_COLUMNS, errors='ignore')
+        kinds = {}
+        for column in rows.columns:
+            if pd.api.types.is_datetime64_any_dtype(rows[column].dtype):
+                values = rows[column].astype('datetime64[ns]')
+                rows[column] = pd.array(values.to_numpy().view('i8'), dtype='Int64')
+                rows.loc[values.isna(), column] = pd.NA
+                kinds[column] = 'datetime'
+            elif isinstance(rows[column].dtype, pd.CategoricalDtype):
+                rows[column] = rows[column].astype(object)
+                kinds[column] = 'text'
+            else:
+                kinds[column] = 'value'
+
+        # New columns in this export are added to the events table before appending
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(events)')}
+        for column in rows.columns:
+            if column not in existing:
+                conn.execute(f'ALTER TABLE events ADD COLUMN {quote(column)}')
+        conn.executemany('INSERT OR IGNORE INTO event_columns (name, kind) VALUES (?, ?)', kinds.items())
+        conn.executemany('INSERT INTO workbook_values VALUES (?, ?, ?, ?)',
+                         [(digest, column, position, value)
+                          for column, kind in kinds.items() if kind == 'text'
+                          for position, value in enumerate(rows[column].dropna().unique())])
+
+        # DataFrame.to_sql commits on its own, so the rows are inserted here to stay inside the one transaction
+        rows.insert(0, 'Workbook', digest)
+        values = [rows[column].astype(object).where(rows[column].notna(), None).tolist() for column in rows.columns]
+        conn.executemany(f'INSERT INTO events ({", ".join(quote(column) for column in rows.columns)}) '
+                         f'VALUES ({", ".join("?" * len(rows.columns))})', zip(*values))
+        conn.execute('INSERT INTO workbooks VALUES (?, ?, ?, ?, ?, ?)',
+                     (digest, name, len(rows),
+                      to_nanoseconds(df['Start Datetime'].min()) if df['Start Datetime'].notna().any() else None,
+                      to_nanoseconds(df['End Datetime'].max()) if df['End Datetime'].notna().any() else None,
+                      datetime.now().isoformat(timespec='seconds')))
+    return True
+
+
+def stored_workbooks(path=None):
+    if not os.path.exists(path or STORE_PATH):
+        return pd.DataFrame(columns=['digest', 'name', 'events', 'first_start', 'last_end', 'stored_at'])
+    with closing(connect(path)) as conn:
+        workbooks = pd.read_sql_query('SELECT * FROM workbooks ORDER BY first_start, name', conn)
+    for column in ['first_start', 'last_end']:
+        workbooks[column] = pd.to_datetime(workbooks[column], unit='ns')
+    return workbooks
+
+
+def store_size(path=None):
+    path = path or STORE_PATH
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def workbook_condition(digests, column='Workbook'):
+    return f'{column} IN ({", ".join("?" * len(digests))})', list(digests)
+
+
+def distinct(digests, column, path=None):
+    # In order of first appearance, like Series.unique() on the uploaded workbooks, from the values recorded
+    # when each workbook was stored
+    condition, params = workbook_condition(digests, 'digest')
+    with closing(connect(path)) as conn:
+        rows = conn.execute(f'SELECT value FROM workbook_values JOIN workbooks USING (digest) '
+                            f'WHERE {condition} AND column_name = ? '
+                            f'ORDER BY workbooks.rowid, position', params + [column]).fetchall()
+    return list(dict.fromkeys(row[0] for row in rows))
+
+
+def filter_condition(digests, category_column, selected_categories, start, end, selected_equipment, clip=False):
+    # The sidebar filters as one WHERE clause, matching FilterEngine.select
+    conditions, params = workbook_condition(digests)
+    conditions = [conditions]
+    for column, values in [(category_column, selected_categories),
+                           ('Original Equipment', selected_equipment),
+                           ('Reclassified Equipment', selected_equipment)]:
+        values = list(values)
+        conditions.append(f'{quote(column)} IN ({", ".join("?" * len(values))})')
+        params.extend(values)
+    if clip:
+        conditions.append('"Start Datetime" < ? AND "End Datetime" > ?')
+        params.extend([to_nanoseconds(end), to_nanoseconds(start)])
+    else:
+        conditions.append('"Start Datetime" >= ? AND "End Datetime" <= ?')
+        params.extend([to_nanoseconds(start), to_nanoseconds(end)])
+    return ' AND '.join(conditions), params
+
+
+def query_events(digests, category_column, selected_categories, start, end, selected_equipment, clip=False, path=None):
+    condition, params = filter_condition(digests, category_column, selected_categories, start, end,
+                                         selected_equipment, clip)
+    with closing(connect(path)) as conn:
+        # Columns in the order the exports had them, rather than the events table's
+        columns = conn.execute('SELECT name, kind FROM event_columns ORDER BY rowid').fetchall()
+        df = pd.read_sql_query(f'SELECT events.*, workbooks.name AS Source FROM events '
+                               f'JOIN workbooks ON workbooks.digest = events.Workbook '
+                               f'WHERE {condition} ORDER BY "Start Datetime"', conn, params=params)
+    df = df[[name for name, _ in columns] + ['Source']]
+    for name, kind in columns:
+        if kind == 'datetime':
+            df[name] = pd.to_datetime(df[name], unit='ns')
+    return compact_frame(df)
+
+
+def query_totals(digests, category_column, selected_categories, start, end, selected_equipment, clip=False, path=None):
+    # Seconds per combination of the cube dimensions, summed by SQLite; the same table DurationCube.slice returns
+    condition, params = filter_condition(digests, category_column, selected_categories, start, end,
+                                         selected_equipment, clip)
+    with closing(connect(path)) as conn:
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(events)')}
+        dimensions = ', '.join(quote(column) for column in CUBE_DIMENSIONS if column in existing)
+        if clip:
+            seconds = 'SUM((MIN("End Datetime", ?) - MAX("Start Datetime", ?)) / 1e9)'
+            params = [to_nanoseconds(end), to_nanoseconds(start)] + params
+        else:
+            seconds = 'SUM(("End Datetime" - "Start Datetime") / 1e9)'
+        totals = pd.read_sql_query(f'SELECT {dimensions}, {seconds} AS Seconds FROM events '
+                                   f'WHERE {condition} GROUP BY {dimensions}', conn, params=params)
+    totals['Seconds'] = totals['Seconds'].astype(np.float64)
+    return totals
@@ -0,0 +1,43 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Built figures (and the small tables drawn next to them), kept per dataset digest and section parameters
+# so that going back to an earlier selection skips rebuilding the figure. Shared by every session.
+
+FIGURE_CACHE_ENTRIES = int(os.environ.get("DMO_FIGURE_CACHE_ENTRIES", "64"))
+
+
+class FigureCache:
+    def __init__(self, max_entries=FIGURE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        # Built outside the lock so other sessions are not held up; a concurrent miss on the same key builds twice
+        value = build()
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+figure_cache = FigureCache()
+# Validation results are tables rather than figures, so they are kept apart and do not push figures out
+validation_cache = FigureCache()
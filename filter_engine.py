@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = ['Original Category', 'Reclassified Category']
+EQUIPMENT_COLUMNS = ['Original Equipment', 'Reclassified Equipment']
+
+
+def encode_columns(df, columns):
+    dtype = df[columns[0]].dtype
+    if isinstance(dtype, pd.CategoricalDtype) and all(df[column].dtype == dtype for column in columns):
+        # The loader already gave these columns one shared dictionary, so its codes are used as they are
+        return {column: df[column].cat.codes.to_numpy() for column in columns}, dtype.categories
+
+    # Factorize the columns against one shared dictionary so a single bitmap covers all of them
+    codes, values = pd.factorize(pd.concat([df[column] for column in columns], ignore_index=True))
+    return {column: codes[i * len(df):(i + 1) * len(df)] for i, column in enumerate(columns)}, values
+
+
+def to_datetime64(value):
+    return pd.Timestamp(value).to_datetime64().astype('datetime64[ns]')
+
+
+def clip_events(df, start, end):
+    # Trims events straddling the window to its bounds; their duration follows the trimmed bounds
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if not ((df['Start Datetime'] < start) | (df['End Datetime'] > end)).any():
+        return df
+    df = df.assign(**{'Start Datetime': df['Start Datetime'].clip(lower=start),
+                      'End Datetime': df['End Datetime'].clip(upper=end)})
+    if 'Duration Seconds' in df:
+        df['Duration Seconds'] = (df['End Datetime'] - df['Start Datetime']).dt.total_seconds()
+    return df
+
+
+class FilterEngine:
+    # Built once per loaded dataset: rows sorted by Start Datetime, categories and equipment as integer codes
+    def __init__(self, df, cache_size=32):
+        order = np.argsort(df['Start Datetime'].to_numpy(), kind='stable')
+        self.df = df.take(order).reset_index(drop=True)
+        self.starts = self.df['Start Datetime'].to_numpy().astype('datetime64[ns]')
+        self.ends = self.df['End Datetime'].to_numpy().astype('datetime64[ns]')
+        # Latest end among all events starting at or before each row, used to find events overlapping a window
+        self.max_ends = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+        self.category_codes, self.categories = encode_columns(self.df, CATEGORY_COLUMNS)
+        self.equipment_codes, self.equipment = encode_columns(self.df, EQUIPMENT_COLUMNS)
+        self.cache_size = cache_size
+        self.selections = OrderedDict()
+        # The engine is shared between sessions, so the memo is guarded by a lock
+        self.lock = threading.Lock()
+
+    def bitmap(self, values, selected):
+        # One extra False slot at the end so missing values (code -1) never match
+        bitmap = np.zeros(len(values) + 1, dtype=bool)
+        bitmap[:-1] = values.isin(list(selected))
+        return bitmap
+
+    def select(self, category_column, selected_categories, start, end, selected_equipment, clip=False):
+        # Without clip only events lying entirely inside the window are selected, with clip every event overlapping it
+        key = (category_column, frozenset(selected_categories), start, end, frozenset(selected_equipment), clip)
+        with self.lock:
+            if key in self.selections:
+                self.selections.move_to_end(key)
+                return self.selections[key]
+
+        positions = self.search(category_column, selected_categories, start, end, selected_equipment, clip)
+        with self.lock:
+            self.selections[key] = positions
+            if len(self.selections) > self.cache_size:
+                self.selections.popitem(last=False)
+        return positions
+
+    def search(self, category_column, selected_categories, start, end, selected_equipment, clip=False):
+        # select() without the memo, for callers that look up many short-lived windows
+        start, end = to_datetime64(start), to_datetime64(end)
+        if clip:
+            # Rows before lo all ended by the window start, and rows from hi on start after its end
+            lo = np.searchsorted(self.max_ends, start, side='right')
+            hi = np.searchsorted(self.starts, end, side='left')
+            in_window = self.ends[lo:hi] > start
+        else:
+            # Events starting after the window end can never finish inside it, so both bounds are binary searches
+            lo = np.searchsorted(self.starts, start, side='left')
+            hi = np.searchsorted(self.starts, end, side='right')
+            in_window = self.ends[lo:hi] <= end
+
+        category_bitmap = self.bitmap(self.categories, selected_categories)
+        equipment_bitmap = self.bitmap(self.equipment, selected_equipment)
+        mask = (in_window &
+                category_bitmap[self.category_codes[category_column][lo:hi]] &
+                equipment_bitmap[self.equipment_codes['Original Equipment'][lo:hi]] &
+                equipment_bitmap[self.equipment_codes['Reclassified Equipment'][lo:hi]])
+        return lo + np.flatnonzero(mask)
+
+    def frame(self, positions, columns=None):
+        df = self.df if columns is None else self.df[columns]
+        # A contiguous run of rows (e.g. everything in the window selected) is sliced, which copies nothing
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            return df.iloc[positions[0]:positions[-1] + 1]
+        return df.take(positions)
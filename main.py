@@ -1,316 +1,125 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import math
+import functools
+import sqlite3
 from PIL import Image
-import plotly.graph_objs as go
 import plotly.figure_factory as ff
 from datetime import datetime, date, time
+import data_cache
+import event_store
+import profiling
+from figure_cache import figure_cache, validation_cache
+from paged_table import paged_table
+from validator import validate
+from filter_engine import FilterEngine, clip_events
+from duration_cube import CUBE_DIMENSIONS, DurationCube
+from analysis import TIME_FACTORS, add_duration, add_total_row, gap_table, prepare_timeline_data
+from buckets import GRANULARITIES, SHIFT_CALENDARS, bucket_totals, parse_calendar, shift_offsets, trend_table
+from charts import LOD_RAW_WINDOW, pareto_figure, pareto_with_colors_figure, timeline_figure, trend_figure, waterfall_figure
 
 img = Image.open('Nestle_Logo.png')
 st.set_page_config(page_title="DMO-P Validation Tool", page_icon=img,layout="wide")
 
 # Step 1: Read the Excel file and preprocess the data
-@st.cache
-def load_data(file_path):
-    df = pd.read_excel(file_path)
-    # Convert 'Start Datetime' and 'End Datetime' columns to datetime
-    df['Start Datetime'] = pd.to_datetime(df['Start Datetime'])
-    df['End Datetime'] = pd.to_datetime(df['End Datetime'])
-    return df
-
-def format_duration(duration):
-    hours = duration.seconds // 3600
-    minutes = (duration.seconds % 3600) // 60
-    seconds = duration.seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-
-def create_timeline(df, default_cat, start_date, end_date, start_time, end_time, selected_categories, selected_equipment, y_axis):
-    # Create a list of colors corresponding to each category
-    category_colors = {
-        "Production Time": "green",
-        "Unplanned Stoppages": "red",
-        "Not Occupied": "grey",
-        "Planned Stoppages": "yellow"
-    }
-
-    # Combine start datetime with start time and end datetime with end time
-    combined_start_datetime = datetime.combine(start_date, start_time)
-    combined_end_datetime = datetime.combine(end_date, end_time)
-    #st.write(combined_start_datetime)
-    #st.write(combined_end_datetime)
-
-    # Filter data based on selected categories and date range
-    filtered_df = df[(df[default_cat].isin(selected_categories)) &
-                     (df['Start Datetime'] >= combined_start_datetime) &
-                     (df['End Datetime'] <= combined_end_datetime) &
-                     ((df['Original Equipment'].isin(selected_equipment)) &
-                      (df['Reclassified Equipment'].isin(selected_equipment)))]
-
-    # Create a list of data for plotting
-    data = []
-    for index, row in filtered_df.iterrows():
-        category = row['Original Category']
-        start_time = row['Start Datetime']
-        end_time = row['End Datetime']
-        duration = end_time - start_time
-        formatted_duration = format_duration(duration)
-        data.append({
-            'Original Equipment': row['Original Equipment'],
-            'Reclassified Equipment': row['Reclassified Equipment'],
-            'Category': category,
-            'Original Sub Category': row['Original Sub Category'],
-            'Reclassified Category': row['Reclassified Category'],
-            'Reclassified Sub Category': row['Reclassified Sub Category'],
-            'Start Datetime': start_time,
-            'End Datetime': end_time,
-            'Duration': formatted_duration,
-            'PLC Code': row['PLC Code'],
-            'Reclassified Reason': row['Reclassified Reason'],
-            'Original Reason': row['Original Reason'],
-        })
-
-    # Create a DataFrame from the list of data
-    df_plot = pd.DataFrame(data)
-
-    if y_axis == "Original Equipment":
-        colour = "Category"
-        sub_cat = "Original Sub Category"
-        reason = "Original Reason"
-    else:
-        colour = 'Reclassified Category'
-        sub_cat = 'Reclassified Sub Category'
-        reason = 'Reclassified Reason'
-    
-    # Plot the graph using Plotly Express
-    fig = px.timeline(df_plot, x_start="Start Datetime", x_end="End Datetime", y=y_axis,
-                      color=colour, color_discrete_map=category_colors,
-                      hover_data={sub_cat: True,
-                                  "Start Datetime": "|%Y-%m-%d %H:%M:%S",
-                                  "End Datetime": "|%Y-%m-%d %H:%M:%S",
-                                  "Duration": True,
-                                  "PLC Code": True,
-                                  reason: True})
-    fig.update_yaxes(categoryorder="category ascending")
-    fig.update_layout(title=f"🕔 Duration of {y_axis}",
-                      xaxis_title="Datetime",
-                      yaxis_title=y_axis,
-                      width=1300,
-                      height=400)
+# Each parsed workbook is kept on disk by data_cache (keyed by its file hash),
+# and the combined dataset is kept in memory per digest of all uploaded files
+@st.cache_resource(max_entries=4, show_spinner="Loading workbooks...")
+def load_data(dataset_digest, _files):
+    return data_cache.load_workbooks(_files)
+
+# One filter engine per loaded dataset, reused by every rerun and session that opens the same file
+@st.cache_resource(max_entries=4)
+def build_filter_engine(file_digest, _df):
+    return FilterEngine(_df)
+
+@st.cache_resource(max_entries=4)
+def build_duration_cube(file_digest, _engine):
+    return DurationCube(_engine)
+
+def show_cache_stats(df):
+    entries, size = data_cache.cache_size()
+    st.sidebar.write(f"🗄 Workbook cache: {data_cache.cache_stats['hits']} hit(s), "
+                     f"{data_cache.cache_stats['misses']} miss(es), "
+                     f"{entries} file(s), {size / (1024 * 1024):.1f} MB")
+    loaded_bytes, compact_bytes = data_cache.memory_report(df)
+    if loaded_bytes:
+        st.sidebar.write(f"🧮 Event table memory: {loaded_bytes / (1024 * 1024):.1f} MB as read from Excel, "
+                         f"{compact_bytes / (1024 * 1024):.1f} MB compacted")
+
+def show_figure_cache_stats(placeholder):
+    # Filled in once the sections are built, so the counts include this rerun's figures
+    placeholder.write(f"🖼 Figure cache: {figure_cache.hits} hit(s), {figure_cache.misses} miss(es), "
+                      f"{len(figure_cache.entries)} of {figure_cache.max_entries} figure(s)")
+
+def store_files(files):
+    # Each workbook is stored on its own (once per file hash), from the parsed copy in the workbook cache
+    stored_digests = set(event_store.stored_workbooks()['digest'])
+    for name, file_bytes in files:
+        digest = data_cache.file_digest(file_bytes)
+        if digest not in stored_digests:
+            try:
+                event_store.store_workbook(digest, name, data_cache.load_workbook(file_bytes, digest))
+            except sqlite3.OperationalError as error:
+                # e.g. "database is locked" while another session writes for longer than the busy timeout;
+                # the upload is still shown from the workbook cache and storing is retried on the next rerun
+                st.sidebar.warning(f"Could not keep {name} in the local store: {error}")
+
+def show_store_stats():
+    stored = event_store.stored_workbooks()
+    if len(stored):
+        st.sidebar.write(f"🗃 Local store: {len(stored)} workbook(s), {stored['events'].sum()} events, "
+                         f"{event_store.store_size() / (1024 * 1024):.1f} MB")
+
+def visible_columns(df):
+    # The loader's own columns stay out of the event tables and the column choices
+    return [column for column in df.columns if column not in data_cache.INTERNAL_COLUMNS]
+
+# Number of partitions the detailed breakdown builds figures for at a time
+PARTITION_PAGE_SIZE = 10
+
+def show_figure(fig):
+    profiling.record_payload(lambda: profiling.figure_bytes(fig))
     st.plotly_chart(fig)
 
+def cached_figure(cache_key, build):
+    # Figures are built once per dataset and section parameters; without a key they are always rebuilt
+    if cache_key is None:
+        return build()
+    return figure_cache.get_or_build(cache_key, build)
 
-def create_pareto(df, category_column, value_column, duration_type, avail_cat):
-    # Define category colors
-    color_catalogue = {
-        "Production Time": "green",
-        "Unplanned Stoppages": "red",
-        "Not Occupied": "grey",
-        "Planned Stoppages": "yellow"
-    }
-    if len(df[avail_cat].unique()) == 1:
-        category_colors = {}
-        category_col = df[avail_cat].unique()[0]
-        category_colors[category_col] = color_catalogue.get(category_col)
-    else:
-        category_colors = color_catalogue
-        
-    # Group data by category and sum the duration
-    df_grouped = df.groupby(category_column)[value_column].sum().reset_index()
-
-    # Sort categories based on the sum of duration
-    df_sorted = df_grouped.sort_values(by=value_column, ascending=False)
-
-    # Calculate cumulative percentage
-    df_sorted["cumulative_percentage"] = (df_sorted[value_column].cumsum() / df_sorted[value_column].sum()) * 100
-
-    # Plot Pareto diagram
-    fig = go.Figure()
-
-    # Add bars for frequencies with text outside the bars
-    if len(df[avail_cat].unique()) == 1:
-        fig.add_trace(go.Bar(
-            x=df_sorted[category_column],
-            y=df_sorted[value_column],
-            name='Hours',
-            text=df_sorted[value_column].round(2),  # Round the values to two decimal places
-            textposition='outside',  # Display text outside the bars
-            marker_color=list(category_colors.values())[0]
-        ))
-    else:
-        fig.add_trace(go.Bar(
-            x=df_sorted[category_column],
-            y=df_sorted[value_column],
-            name='Hours',
-            text=df_sorted[value_column].round(2),  # Round the values to two decimal places
-            textposition='outside',  # Display text outside the bars
-            marker_color=[category_colors.get(category, "blue") for category in df_sorted[category_column]]  # Set bar colors based on category
-        ))
-
-    # Add the cumulative percentage line
-    fig.add_trace(go.Scatter(
-        x=df_sorted[category_column],
-        y=df_sorted['cumulative_percentage'],
-        name='Cumulative Percentage',
-        line=dict(color="navy"),
-        yaxis='y2'  # Secondary y-axis
-    ))
-
-    # Update the layout
-    fig.update_layout(
-        title=f"✅ {df[avail_cat].unique()[0] if len(df[avail_cat].unique()) == 1 else category_column} Pareto Diagram",
-        height=500,
-        yaxis=dict(
-            title=duration_type
-        ),
-        yaxis2=dict(
-            title='Cumulative Percentage (%)',
-            overlaying='y',
-            side='right'
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='right',
-            x=1
-        )
-    )
-    st.plotly_chart(fig)
-
-def create_pareto_with_colors(df, category_column, value_column, duration_type, paretoed_param, color_column):
-    # Define category colors
-    color_catalogue = {
-        "Production Time": "green",
-        "Unplanned Stoppages": "red",
-        "Not Occupied": "grey",
-        "Planned Stoppages": "yellow"
-    }
+def create_timeline(timeline_data, y_axis, window_start, window_end, full_resolution=False, issues=None, cache_key=None):
+    # timeline_data is a callable, so the timeline frame is only prepared when the figure is not cached
+    def build():
+        df_plot = timeline_data()
+        fig, merged = timeline_figure(df_plot, y_axis, window_start, window_end, full_resolution, issues)
+        return fig, len(df_plot), None if merged is None else len(merged)
 
-    # Group data by category and sum the duration
-    df_grouped = df.groupby(category_column)[value_column].sum().reset_index()
+    fig, events, segments = cached_figure(cache_key, build)
+    if segments is not None:
+        st.caption(f"Level of detail: {events} events drawn as {segments} segments. "
+                   f"Narrow the time window to {LOD_RAW_WINDOW / pd.Timedelta(hours=1):g} hours or less, or enable full resolution, to see raw events.")
+    show_figure(fig)
 
-    # Sort categories based on the sum of duration
-    df_sorted = df_grouped.sort_values(by=value_column, ascending=False)
 
-    # Calculate cumulative percentage
-    df_sorted["cumulative_percentage"] = (df_sorted[value_column].cumsum() / df_sorted[value_column].sum()) * 100
+def create_pareto(df, category_column, value_column, duration_type, avail_cat, cache_key=None):
+    show_figure(cached_figure(cache_key, lambda: pareto_figure(df, category_column, value_column, duration_type, avail_cat)))
 
-    # Initialize list to store bar colors
-    bar_colors = []
+def create_pareto_with_colors(df, category_column, value_column, duration_type, paretoed_param, color_column, cache_key=None):
+    show_figure(cached_figure(cache_key, lambda: pareto_with_colors_figure(df, category_column, value_column, duration_type, paretoed_param, color_column)))
 
-    # If color_column is provided, assign colors dynamically based on its values
-    if color_column:
-        for category in df_sorted[category_column]:
-            corresponding_color = color_catalogue.get(df[df[category_column] == category][color_column].iloc[0], "blue")
-            bar_colors.append(corresponding_color)
-    else:
-        # Use default color for all bars if color_column is not provided
-        default_color = "blue"
-        bar_colors = [default_color] * len(df_sorted)
-
-    # Plot Pareto diagram
-    fig = go.Figure()
-
-    # Add bars for frequencies with text outside the bars
-    fig.add_trace(go.Bar(
-        x=df_sorted[category_column],
-        y=df_sorted[value_column],
-        name='Hours',
-        text=df_sorted[value_column].round(2),  # Round the values to two decimal places
-        textposition='outside',  # Display text outside the bars
-        marker_color=bar_colors  # Set bar colors based on category
-    ))
-
-    # Add the cumulative percentage line
-    fig.add_trace(go.Scatter(
-        x=df_sorted[category_column],
-        y=df_sorted['cumulative_percentage'],
-        name='Cumulative Percentage',
-        line=dict(color="navy"),
-        yaxis='y2'  # Secondary y-axis
-    ))
-
-    # Update the layout
-    fig.update_layout(
-        title=f"📇 {paretoed_param} Pareto Diagram",
-        height=500,
-        yaxis=dict(
-            title=duration_type
-        ),
-        yaxis2=dict(
-            title='Cumulative Percentage (%)',
-            overlaying='y',
-            side='right'
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='right',
-            x=1
-        )
-    )
-
-    #return fig
-    st.plotly_chart(fig)
+def create_waterfall(df, category_column1, category_column2, value_column, duration_type, cache_key=None):
+    # Totals per performance category before and after reclassification, largest gap first
+    def build():
+        merged_df = gap_table(df, category_column1, category_column2, value_column)
+        return add_total_row(merged_df), waterfall_figure(merged_df, duration_type)
 
-def create_waterfall(df, category_column1, category_column2, value_column, duration_type):
-    # Group data by category and sum the duration
-    pivot_df = df.pivot_table(index=category_column1, values=value_column, aggfunc='sum')
-    # Define the predefined categories
-    predefined_categories = ['Not Occupied', 'Planned Stoppages', 'Production Time', 'Unplanned Stoppages']
-    pivot_df = pivot_df.reindex(predefined_categories, fill_value=0)
-    df_sorted1 = pivot_df.reset_index()
-
-    # Group data by category and sum the duration
-    pivot_df2 = df.pivot_table(index=category_column2, values=value_column, aggfunc='sum')
-    # Define the predefined categories
-    predefined_categories = ['Not Occupied', 'Planned Stoppages', 'Production Time', 'Unplanned Stoppages']
-    pivot_df2 = pivot_df2.reindex(predefined_categories, fill_value=0)
-    df_sorted2 = pivot_df2.reset_index()
-
-    merged_df = pd.merge(df_sorted1, df_sorted2, left_on=category_column1, right_on=category_column2)
-    merged_df.drop(columns=[category_column2], inplace=True)
-    merged_df['Duration_Difference'] = merged_df['Duration_y'] - merged_df['Duration_x']
-    merged_df.columns = ['Category', 'Original', 'Reclassified', 'Gap']
-
-    #categories = list(['Ref']) + merged_df['Category'].tolist()
-    #values = list([sum(merged_df['Reclassified'].tolist())]) + merged_df['Gap'].tolist()
-
-    merged_df = merged_df.sort_values(by='Gap',ascending=False)
-    categories = merged_df['Category'].tolist()
-    values = merged_df['Gap'].tolist()
-    values = [round(num, 2) for num in values]
-    
-    fig = go.Figure(go.Waterfall(
-        x=categories,
-        y=values,
-        measure=["relative" if val != 1 else "total" for val in values],  # Different measure for each bar
-        base=-10,  # Set the base to 100
-        increasing=dict(marker=dict(color="green")),  # Set color for increasing values
-        decreasing=dict(marker=dict(color="red")),  # Set color for decreasing values
-        connector=dict(line=dict(color="grey", width=2)),  # Customize connector line
-        text=values,  # Custom text for each bar
-        #text=[0] + [values[i] - values[i - 1] for i in range(1, len(values))],  # Custom text for each bar
-        textposition="outside",  # Set text position outside the bars
-        hoverinfo="y+text",  # Display y value and custom text on hover
-    ))
-    # Update layout
-    fig.update_layout(
-        title='📈 Gap Analysis with Waterfall Graph',
-        yaxis=dict(title=duration_type),
-        xaxis=dict(title='Category'),
-        showlegend=True,
-        height=500
-    )
+    gap_df, fig = cached_figure(cache_key, build)
     col1, col2 = st.columns(2)
     with col1:
         st.write("▶ Total Duration (hrs) of Original Vs Reclassification per Performance Category")
-        total_sum = merged_df.sum()
-        total_row = pd.DataFrame({'Category': ['Total'], 'Original': [total_sum['Original']], 'Reclassified': [total_sum['Reclassified']], 'Gap': [total_sum['Gap']]})
-        merged_df = pd.concat([merged_df, total_row])
-        merged_df = merged_df.reset_index(drop=True)
-        st.write(merged_df)
+        profiling.record_payload(lambda: profiling.table_bytes(gap_df))
+        st.write(gap_df)
 
         #reclassified_equipment = st.multiselect("Filter by Reclassified Equipment", df['Reclassified Equipment'].unique(), df['Reclassified Equipment'].unique())
         #filtered_df = df[df['Reclassified Equipment'].isin(reclassified_equipment)]
@@ -319,27 +128,208 @@ def create_waterfall(df, category_column1, category_column2, value_column, durat
         #pivot_table = pd.pivot_table(filtered_df, values='Duration', index=['Reclassified Category', 'Original Category'], columns='Original Equipment', aggfunc='sum', fill_value=0)
         #st.write(pivot_table)
     with col2:
-        st.plotly_chart(fig)
+        show_figure(fig)
+
+# Each section below is a fragment: a change to one of its own widgets reruns only that section.
+# view_key identifies the dataset and sidebar filters the section was drawn for.
+
+@st.fragment
+def timeline_section(view_key, filtered_df, window_start, window_end, full_resolution, issues=None, min_gap=None):
+    # Shared by both timelines, and only prepared if one of them has to be built
+    @functools.cache
+    def timeline_data():
+        with profiling.stage("Timeline data prep", rows_in=len(filtered_df)) as stage:
+            timeline_df = prepare_timeline_data(filtered_df)
+            stage['Rows out'] = len(timeline_df)
+        return timeline_df
+
+    for y_axis in ["Original Equipment", "Reclassified Equipment"]:
+        with profiling.stage(f"Timeline ({y_axis})", rows_in=len(filtered_df)):
+            view_issues = None if issues is None else issues[issues['View'] == y_axis]
+            # Full-resolution figures hold every event of the window (tens of MB for a wide one), so they are
+            # rebuilt rather than kept in the figure cache shared by all sessions
+            create_timeline(timeline_data, y_axis, window_start, window_end, full_resolution, view_issues,
+                            cache_key=None if full_resolution else
+                            view_key + ("timeline", y_axis, issues is not None, min_gap))
+
+@st.fragment
+def validation_section(issues, coverage, min_gap):
+    st.title("🧪 Timeline Validation (Overlaps and Gaps)")
+    counts = issues['Issue'].value_counts()
+    st.caption(f"{counts.get('Overlap', 0)} overlap(s) and {counts.get('Gap', 0)} gap(s) longer than {min_gap:g} s "
+               f"across the Original and Reclassified equipment timelines")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("▶ Coverage per Equipment")
+        paged_table(coverage, key="validation-coverage", height=400)
+    with col2:
+        st.write("▶ Overlaps and Gaps")
+        paged_table(issues, key="validation-issues", height=400)
+
+@st.fragment
+def event_listing_section(filtered_df):
+    with profiling.stage("Event listing", rows_in=len(filtered_df)):
+        st.write("📅 DMO Event Listing")
+        paged_table(filtered_df[visible_columns(filtered_df)], key="events", height=250)
+
+@st.fragment
+def category_pareto_section(view_key, cube_df, duration_type, default_cat):
+    # Create Pareto diagram for Both Category
+    with profiling.stage("Category Paretos", rows_in=len(cube_df)):
+        col1, col2 = st.columns(2)
+        with col1:
+            create_pareto(cube_df, "Original Category", "Duration", duration_type, default_cat,
+                          cache_key=view_key + ("pareto", "Original Category", duration_type))
+
+        with col2:
+            create_pareto(cube_df, "Reclassified Category", "Duration", duration_type, default_cat,
+                          cache_key=view_key + ("pareto", "Reclassified Category", duration_type))
+
+@st.fragment
+def waterfall_section(view_key, cube_df, duration_type):
+    with profiling.stage("Waterfall", rows_in=len(cube_df)):
+        create_waterfall(cube_df,"Original Category","Reclassified Category", "Duration", duration_type,
+                         cache_key=view_key + ("waterfall", duration_type))
+
+CUSTOM_CALENDAR = "Custom..."
+
+@st.fragment
+def trend_section(view_key, filtered_df, duration_type):
+    st.write("▶ Original Vs Reclassification per Shift, Day or Week")
+    granularity_col, calendar_col, custom_col = st.columns([1, 2, 3])
+    granularity = granularity_col.selectbox("Trend per", GRANULARITIES)
+    calendar_name = calendar_col.selectbox("Shift calendar", list(SHIFT_CALENDARS) + [CUSTOM_CALENDAR])
+    if calendar_name == CUSTOM_CALENDAR:
+        spec = custom_col.text_input("Shifts (name=HH:MM, ...)", value="Shift 1=06:00, Shift 2=14:00, Shift 3=22:00")
+        try:
+            calendar = parse_calendar(spec)
+            shift_offsets(calendar)
+        except ValueError as error:
+            st.error(f"Invalid shift calendar: {error}")
+            return
+    else:
+        calendar = SHIFT_CALENDARS[calendar_name]
+
+    with profiling.stage(f"Trend per {granularity}", rows_in=len(filtered_df)):
+        # Events are split at every bucket boundary once; both views are summed from the same pieces
+        def build():
+            totals = bucket_totals(filtered_df, ["Original Category", "Reclassified Category"], granularity, calendar)
+            figures = []
+            for category_column, table in totals.items():
+                table = table.assign(Seconds=TIME_FACTORS[duration_type]*table['Seconds'])
+                figures.append(trend_figure(trend_table(table, category_column), category_column, duration_type, granularity))
+            return figures
+
+        figures = cached_figure(view_key + ("trend", granularity, tuple(calendar), duration_type), build)
+        col1, col2 = st.columns(2)
+        with col1:
+            show_figure(figures[0])
+        with col2:
+            show_figure(figures[1])
+
+@st.fragment
+def overall_section(view_key, filtered_df, cube_df, available_category, duration_type, default_cat):
+    st.title("📂 Overall Line Performance (Overview)")
+    header_df = visible_columns(filtered_df)
+    selected_header = st.selectbox("Choose what parameter to breakdown the Pareto:", header_df, index=header_df.index('Reclassified Reason'))
+
+    with profiling.stage("Overall breakdown", rows_in=len(filtered_df)):
+        # Columns kept in the cube are broken down from it; any other column falls back to the event rows
+        pareto_source = cube_df if selected_header in CUBE_DIMENSIONS else filtered_df
+        for category in available_category:
+            data_cat = filtered_df[filtered_df[default_cat] == category]
+            col1, col2 = st.columns(2)
+            with col1:
+                create_pareto(pareto_source[pareto_source[default_cat] == category], selected_header, "Duration", duration_type, default_cat,
+                              cache_key=view_key + ("overall", selected_header, category, duration_type))
+            with col2:
+                paged_table(data_cat[visible_columns(data_cat)], key=f"overall-{category}", height=400)
+
+@st.fragment
+def detailed_section(view_key, filtered_df, duration_type):
+    st.title("📂 Detailed Line Performance (Specific Parameters)")
+    header_df2 = visible_columns(filtered_df)
+    selected_header2 = st.selectbox("Choose what Parameter to breakdown the Pareto :", header_df2)
+
+    header_filter = visible_columns(filtered_df)
+    selected_header_filter = st.selectbox("Choose what Parameter to be Pareto-ed:", header_filter)
+    
+    #filter_column = st.selectbox("Specify the :", filtered_df[selected_header_filter].unique())
+
+    with profiling.stage("Detailed breakdown", rows_in=len(filtered_df)):
+        # Split the frame once and only build figures for the partitions on the current page
+        partitions = filtered_df.groupby(selected_header_filter, sort=False, observed=True)
+        partition_totals = partitions['Duration'].sum().sort_values(ascending=False)
+        pages = max(1, math.ceil(len(partition_totals) / PARTITION_PAGE_SIZE))
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+        first = (page - 1) * PARTITION_PAGE_SIZE
+        st.caption(f"Showing {selected_header_filter} {first + 1}-{min(first + PARTITION_PAGE_SIZE, len(partition_totals))} "
+                   f"of {len(partition_totals)}, largest total duration first")
+
+        for equipment, total in partition_totals.iloc[first:first + PARTITION_PAGE_SIZE].items():
+            # Filter the data for the current equipment
+            data_cat = partitions.get_group(equipment)
+            with st.expander(f"{equipment} ({total:.2f} {duration_type})", expanded=True):
+                col1, col2 = st.columns(2)
+                with col1:
+                    #create_pareto_with_colors(data_cat, "Reclassified Reason", "Duration", duration_type, equipment, color_column='Reclassified Category')
+                    create_pareto_with_colors(data_cat, selected_header2, "Duration", duration_type, equipment, color_column='Reclassified Category',
+                                              cache_key=view_key + ("detailed", selected_header2, selected_header_filter, equipment, duration_type))
+                with col2:
+                    paged_table(data_cat[visible_columns(data_cat)], key=f"detailed-{selected_header_filter}-{equipment}", height=400)
         
 # Step 2: Create a Streamlit app
-def main():
+def render_app():
     st.title("📊 DMO-Performance Reclassification Validation Tools")
 
-    # Upload file
-    uploaded_file = st.file_uploader("Upload Excel file", type=["xlsx", "xls"])
-
-    if uploaded_file is not None:
-        df = load_data(uploaded_file)
+    # Upload file(s); several lines or months are analyzed as one combined dataset
+    uploaded_files = st.file_uploader("Upload Excel file(s)", type=["xlsx", "xls"], accept_multiple_files=True)
+    keep_in_store = st.checkbox("Keep uploaded workbooks in the local store", value=False,
+                                help=f"Stored in {event_store.STORE_PATH}, so they can be reopened later without uploading them again")
+
+    # Without an upload, workbooks kept earlier can be opened straight from the local store
+    stored_digests = []
+    if not uploaded_files:
+        stored = event_store.stored_workbooks()
+        if len(stored):
+            labels = {row.digest: f"{row.name} ({row.first_start:%Y-%m-%d} to {row.last_end:%Y-%m-%d}, {row.events} events)"
+                      for row in stored.itertuples()}
+            stored_digests = st.multiselect("Or open workbooks from the local store", list(labels), format_func=labels.get)
+
+    if uploaded_files or stored_digests:
+        with profiling.stage("Load data") as stage:
+            if uploaded_files:
+                files = sorted((uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files)
+                file_digest = data_cache.file_digest("".join(name + data_cache.file_digest(file_bytes)
+                                                             for name, file_bytes in files).encode())
+                df = load_data(file_digest, files)
+                engine = build_filter_engine(file_digest, df)
+                cube = build_duration_cube(file_digest, engine)
+                if keep_in_store:
+                    store_files(files)
+                available_categories = df['Original Category'].unique()
+                available_equipment = df['Reclassified Equipment'].unique()
+                first_start, last_end = df['Start Datetime'].min(), df['End Datetime'].max()
+                stage['Rows out'] = len(df)
+            else:
+                # Only the filter choices are read here; the events themselves are queried once the filters are set
+                file_digest = "store:" + ",".join(sorted(stored_digests))
+                selected_stored = stored[stored['digest'].isin(stored_digests)]
+                available_categories = event_store.distinct(stored_digests, 'Original Category')
+                available_equipment = event_store.distinct(stored_digests, 'Reclassified Equipment')
+                first_start, last_end = selected_stored['first_start'].min(), selected_stored['last_end'].max()
+        if uploaded_files:
+            show_cache_stats(df)
+        figure_stats = st.sidebar.empty()
+        show_store_stats()
         st.sidebar.title("🔍 Data Filter:")
 
         # Create a multi-select dropdown for category filter in the sidebar
         default_cat = st.sidebar.selectbox("Select Category", ["Original Category", "Reclassified Category"], index=1)
-        available_categories = df['Original Category'].unique()
         #selected_categories = st.sidebar.multiselect("Select categories", available_categories, default=available_categories)
         selected_categories = [category for category in available_categories if st.sidebar.checkbox(category, value=True)]
 
         # Create a multi-select dropdown for equipment filter in the sidebar
-        available_equipment = df['Reclassified Equipment'].unique()
         #selected_equipment = st.sidebar.multiselect("Select equipment", available_equipment, default=available_equipment)
         st.sidebar.title("🛠 Choose Equipment(s):")
         all_machine_option = "All Machine"
@@ -348,85 +338,97 @@ def main():
 
         st.sidebar.title("⏳ Time Window :")
         # Create date range picker for filtering by date in the sidebar
-        start_date = st.sidebar.date_input("Start Date", min_value=df['Start Datetime'].min().date(),
-                                       max_value=df['End Datetime'].max().date(),
-                                       value=df['Start Datetime'].min().date())
+        start_date = st.sidebar.date_input("Start Date", min_value=first_start.date(),
+                                       max_value=last_end.date(),
+                                       value=first_start.date())
         start_time = st.sidebar.slider("Start Time", value=pd.Timestamp("06:00:00").time(), format="HH:mm:ss")
         
-        end_date = st.sidebar.date_input("End Date", min_value=df['Start Datetime'].min().date(),
-                                     max_value=df['End Datetime'].max().date(),
-                                     value=df['End Datetime'].max().date())
+        end_date = st.sidebar.date_input("End Date", min_value=first_start.date(),
+                                     max_value=last_end.date(),
+                                     value=last_end.date())
         end_time = st.sidebar.slider("End Time", value=pd.Timestamp("06:00:00").time(), format="HH:mm:ss")
         
         duration_type = st.sidebar.selectbox("Select Duration units", ["Seconds", "Hours", "Days"], index=1)
+        full_resolution = st.sidebar.checkbox("Full-resolution timelines", value=False)
+        clip = st.sidebar.checkbox("Clip events at the time window", value=True,
+                                   help="Trim events crossing the window start or end to the window instead of leaving them out")
 
-        # Create bar chart with filter for Original Category
-        create_timeline(df, default_cat, start_date, end_date, start_time, end_time, selected_categories, selected_equipment, "Original Equipment")
+        st.sidebar.title("🧪 Timeline Validation :")
+        highlight_issues = st.sidebar.checkbox("Highlight overlaps and gaps on timelines", value=True)
+        min_gap = st.sidebar.number_input("Ignore gaps up to (seconds)", min_value=0, value=60, step=30)
 
-        # Create bar chart with filter for Reclassified Category
-        create_timeline(df, default_cat,start_date, end_date, start_time, end_time, selected_categories, selected_equipment, "Reclassified Equipment")
-                        
         combined_start_datetime = datetime.combine(start_date, start_time)
         combined_end_datetime = datetime.combine(end_date, end_time)
         
-        filtered_df = df[(df[default_cat].isin(selected_categories)) &
-                         (df['Start Datetime'] >= combined_start_datetime) &
-                         (df['End Datetime'] <= combined_end_datetime) &
-                         ((df['Original Equipment'].isin(selected_equipment)) &
-                         (df['Reclassified Equipment'].isin(selected_equipment)))]
-
-        if duration_type == 'Seconds':
-            time_factor = 1
-        elif duration_type == 'Hours':
-            time_factor = (1/3600)
-        elif duration_type == 'Days':
-            time_factor = 1/(3600*24)
-        filtered_df['Duration'] = time_factor*(filtered_df['End Datetime'] - filtered_df['Start Datetime']).dt.total_seconds()
-
-        st.write("📅 DMO Event Listing")
-        st.dataframe(filtered_df, height=150)
-        # Create Pareto diagram for Both Category
-        col1, col2 = st.columns(2)
-        with col1:
-            create_pareto(filtered_df, "Original Category", "Duration", duration_type, default_cat)
-
-        with col2:
-            create_pareto(filtered_df, "Reclassified Category", "Duration", duration_type, default_cat)
-        
-        create_waterfall(filtered_df,"Original Category","Reclassified Category", "Duration", duration_type)
-
-        st.title("📂 Overall Line Performance (Overview)")
-        header_df = filtered_df.columns.tolist()
-        selected_header = st.selectbox("Choose what parameter to breakdown the Pareto:", header_df, index=header_df.index('Reclassified Reason'))
-
-        available_category = df[default_cat].unique()
-        for category in available_category:
-            data_cat = filtered_df[filtered_df[default_cat] == category]
-            col1, col2 = st.columns(2)
-            with col1:
-                create_pareto(data_cat, selected_header, "Duration", duration_type, default_cat)
-            with col2:
-                st.write(data_cat, height=450, width=150)
-
-
-        st.title("📂 Detailed Line Performance (Specific Parameters)")
-        header_df2 = filtered_df.columns.tolist()
-        selected_header2 = st.selectbox("Choose what Parameter to breakdown the Pareto :", header_df2)
-
-        header_filter = filtered_df.columns.tolist()
-        selected_header_filter = st.selectbox("Choose what Parameter to be Pareto-ed:", header_filter)
-        
-        #filter_column = st.selectbox("Specify the :", filtered_df[selected_header_filter].unique())
-
-        for equipment in filtered_df[selected_header_filter].unique():
-            # Filter the data for the current equipment
-            data_cat = filtered_df[filtered_df[selected_header_filter] == equipment]
-            col1, col2 = st.columns(2)
-            with col1:
-                #create_pareto_with_colors(data_cat, "Reclassified Reason", "Duration", duration_type, equipment, color_column='Reclassified Category')
-                create_pareto_with_colors(data_cat, selected_header2, "Duration", duration_type, equipment, color_column='Reclassified Category')
-            with col2:
-                st.write(data_cat, height=450, width=150)
+        # Every chart and table below consumes this one selection
+        with profiling.stage("Filter", rows_in=len(df) if uploaded_files else None) as stage:
+            if uploaded_files:
+                selection = engine.select(default_cat, selected_categories, combined_start_datetime,
+                                          combined_end_datetime, selected_equipment, clip)
+                filtered_df = engine.frame(selection)
+            else:
+                # Pushed down to SQLite: only the matching events are read
+                filtered_df = event_store.query_events(stored_digests, default_cat, selected_categories,
+                                                       combined_start_datetime, combined_end_datetime,
+                                                       selected_equipment, clip)
+            if clip:
+                filtered_df = clip_events(filtered_df, combined_start_datetime, combined_end_datetime)
+            stage['Rows out'] = len(filtered_df)
+
+        # Everything drawn below is cached per dataset and sidebar selection
+        view_key = (file_digest, default_cat, frozenset(selected_categories),
+                    combined_start_datetime, combined_end_datetime, frozenset(selected_equipment), clip)
+
+        # Overlapping events and untracked time on each equipment, for both equipment views. They belong to the
+        # equipment's whole timeline, so every category is kept and only the equipment and time window apply
+        def validation_results():
+            if uploaded_files:
+                events = engine.frame(engine.select(default_cat, engine.categories, combined_start_datetime,
+                                                    combined_end_datetime, selected_equipment, clip))
+            else:
+                events = event_store.query_events(stored_digests, default_cat,
+                                                  event_store.distinct(stored_digests, default_cat),
+                                                  combined_start_datetime, combined_end_datetime,
+                                                  selected_equipment, clip)
+            if clip:
+                events = clip_events(events, combined_start_datetime, combined_end_datetime)
+            return validate(events, min_gap)
+
+        with profiling.stage("Timeline validation") as stage:
+            issues, coverage = validation_cache.get_or_build((file_digest, combined_start_datetime,
+                                                              combined_end_datetime, frozenset(selected_equipment),
+                                                              clip, min_gap),
+                                                             validation_results)
+            stage['Rows out'] = len(issues)
+
+        timeline_section(view_key, filtered_df, combined_start_datetime, combined_end_datetime, full_resolution,
+                         issues if highlight_issues else None, min_gap)
+
+        time_factor = TIME_FACTORS[duration_type]
+        add_duration(filtered_df, duration_type)
+
+        # Pareto and waterfall charts are derived from the pre-aggregated cube rather than the event rows
+        with profiling.stage("Duration cube slice", rows_in=len(filtered_df)) as stage:
+            if uploaded_files:
+                cube_df = cube.slice(default_cat, selected_categories, combined_start_datetime,
+                                     combined_end_datetime, selected_equipment, selection, clip)
+            else:
+                # Summed by SQLite with GROUP BY over the same dimensions as the cube
+                cube_df = event_store.query_totals(stored_digests, default_cat, selected_categories,
+                                                   combined_start_datetime, combined_end_datetime,
+                                                   selected_equipment, clip)
+            cube_df['Duration'] = time_factor*cube_df['Seconds']
+            stage['Rows out'] = len(cube_df)
+
+        event_listing_section(filtered_df)
+        validation_section(issues, coverage, min_gap)
+        category_pareto_section(view_key, cube_df, duration_type, default_cat)
+        waterfall_section(view_key, cube_df, duration_type)
+        trend_section(view_key, filtered_df, duration_type)
+        overall_categories = df[default_cat].unique() if uploaded_files else event_store.distinct(stored_digests, default_cat)
+        overall_section(view_key, filtered_df, cube_df, overall_categories, duration_type, default_cat)
+        detailed_section(view_key, filtered_df, duration_type)
+        show_figure_cache_stats(figure_stats)
 
         
     st.sidebar.image("Nestle_Signature.png")
@@ -434,6 +436,30 @@ def main():
     st.sidebar.write("""<p style='font-size: 13px;'>For any inquiries, error handling, or assistance, please feel free to reach us through Email: <br>
 <a href="mailto:Ananda.Cahyo@id.nestle.com">Ananda.Cahyo@id.nestle.com <br></p>""", unsafe_allow_html=True)
 
+def request_cprofile():
+    # Picked up at the start of the next rerun, which then runs under cProfile
+    st.session_state["write_cprofile"] = True
+
+def show_profile_panel(profile, profile_path):
+    with st.sidebar.expander("⏱ Rerun profile"):
+        summary = profile.summary()
+        st.dataframe(summary, hide_index=True)
+        st.caption(f"Total {summary['Time (ms)'].sum():.0f} ms, {summary['Payload (KB)'].sum():.0f} KB sent")
+        st.checkbox("Measure figure/table payload sizes", value=True, key="measure_payload")
+        st.button("Write cProfile dump of next rerun", on_click=request_cprofile)
+        if profile_path:
+            st.success(f"cProfile dump written to {profile_path}")
+
+def main():
+    profile = profiling.start_rerun(st.session_state.get("measure_payload", True))
+    profile_path = None
+    if st.session_state.pop("write_cprofile", False):
+        profile_path = profiling.write_cprofile(render_app)
+    else:
+        render_app()
+    show_profile_panel(profile, profile_path)
+    profiling.finish_rerun()
+
 
 if __name__ == "__main__":
     main()
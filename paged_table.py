@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import profiling
+
+# Event tables stay on the server: searching and sorting happen here and only the visible page is sent
+
+PAGE_SIZES = [25, 50, 100, 250]
+NO_SORT = "(original order)"
+
+
+def search_mask(df, text):
+    text = text.lower()
+    mask = np.zeros(len(df), dtype=bool)
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Match against the (few) categories once, then select rows by code
+            hits = series.cat.categories.astype(str).str.lower().str.contains(text, regex=False)
+            mask |= np.isin(series.cat.codes.to_numpy(), np.flatnonzero(hits))
+        elif not pd.api.types.is_datetime64_any_dtype(series.dtype):
+            mask |= series.astype(str).str.lower().str.contains(text, regex=False).to_numpy()
+    return mask
+
+
+def page_slice(df, sort_column=None, ascending=True, page=1, page_size=PAGE_SIZES[0]):
+    # Only the sort key is sorted; the rows of the requested page are then taken by position
+    first = (page - 1) * page_size
+    if not sort_column:
+        return df.iloc[first:first + page_size]
+    positions = df[sort_column].reset_index(drop=True).sort_values(ascending=ascending, kind='stable').index.to_numpy()
+    return df.iloc[positions[first:first + page_size]]
+
+
+def paged_table(df, key, height=None):
+    search_col, sort_col, order_col, size_col, page_col = st.columns([3, 2, 1, 1, 1])
+    search = search_col.text_input("Search", key=f"{key}-search", placeholder="Search all columns")
+    sort_column = sort_col.selectbox("Sort by", [NO_SORT] + list(df.columns), key=f"{key}-sort")
+    ascending = order_col.selectbox("Order", ["Ascending", "Descending"], key=f"{key}-order") == "Ascending"
+    page_size = size_col.selectbox("Rows", PAGE_SIZES, key=f"{key}-size")
+
+    matched = df[search_mask(df, search)] if search else df
+    matches = len(matched)
+    pages = max(1, math.ceil(matches / page_size))
+    # Searching can shrink the number of pages below the one currently selected
+    if st.session_state.get(f"{key}-page", 1) > pages:
+        st.session_state[f"{key}-page"] = pages
+    page = page_col.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=f"{key}-page")
+
+    page_df = page_slice(matched, None if sort_column == NO_SORT else sort_column, ascending, page, page_size)
+    profiling.record_payload(lambda: profiling.table_bytes(page_df))
+    st.dataframe(page_df, hide_index=True, height=height)
+    first = (page - 1) * page_size
+    st.caption(f"Rows {min(first + 1, matches)}-{min(first + page_size, matches)} of {matches}"
+               + (f" (searched {len(df)})" if search else ""))
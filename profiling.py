@@ -0,0 +1,99 @@
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+
+# Per-rerun stage timings for the app. Streamlit runs each session's script in its own thread,
+# so the profile of the rerun in progress is kept thread-local.
+
+PROFILE_DIR = os.environ.get("DMO_PROFILE_DIR", "profiles")
+
+_local = threading.local()
+
+
+class RerunProfile:
+    def __init__(self, measure_payload=True):
+        self.measure_payload = measure_payload
+        self.stages = []
+        self.open_stages = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        record = {'Stage': name, 'Time (ms)': 0.0, 'Rows in': rows_in, 'Rows out': None, 'Payload (KB)': 0.0}
+        self.stages.append(record)
+        self.open_stages.append(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['Time (ms)'] = (time.perf_counter() - started) * 1000
+            self.open_stages.pop()
+
+    def add_payload(self, size):
+        # size is a callable so the (possibly expensive) serialization only happens when measuring
+        if self.measure_payload and self.open_stages:
+            self.open_stages[-1]['Payload (KB)'] += size() / 1024
+
+    def summary(self):
+        return pd.DataFrame(self.stages, columns=['Stage', 'Time (ms)', 'Rows in', 'Rows out', 'Payload (KB)'])
+
+
+def start_rerun(measure_payload=True):
+    _local.profile = RerunProfile(measure_payload)
+    return _local.profile
+
+
+def finish_rerun():
+    # Sections drawn as fragments rerun on their own later; those reruns are not part of this profile
+    _local.profile = None
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    profile = current()
+    if profile is None:
+        yield {}
+        return
+    with profile.stage(name, rows_in) as record:
+        yield record
+
+
+def record_payload(size):
+    profile = current()
+    if profile is not None:
+        profile.add_payload(size)
+
+
+def figure_bytes(fig):
+    return len(fig.to_json())
+
+
+def table_bytes(df):
+    # Streamlit ships tables as Arrow, so the Arrow buffer size is a close estimate of the payload
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False).nbytes
+    except (pa.ArrowException, TypeError, ValueError):
+        return int(df.memory_usage(deep=True).sum())
+
+
+def write_cprofile(func, directory=PROFILE_DIR):
+    # Runs func under cProfile and writes a pstats dump, e.g. for `python -m pstats <file>`
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        func()
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}.pstats")
+        profiler.dump_stats(path)
+    return path
@@ -0,0 +1,124 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Reproducible DMO event tables with the same columns as a real export, for benchmarking:
+#   python synthetic_data.py --rows 100000 --output synthetic_100k.xlsx
+
+CATEGORY_MIX = {
+    "Production Time": 0.55,
+    "Unplanned Stoppages": 0.25,
+    "Planned Stoppages": 0.12,
+    "Not Occupied": 0.08,
+}
+
+# Median event length in seconds; actual lengths are log-normal around it
+MEDIAN_SECONDS = {
+    "Production Time": 1800,
+    "Unplanned Stoppages": 180,
+    "Planned Stoppages": 1200,
+    "Not Occupied": 3600,
+}
+
+SUB_CATEGORIES = {
+    "Production Time": ["Running", "Reduced Speed"],
+    "Unplanned Stoppages": ["Breakdown", "Minor Stop", "Material Shortage", "Quality Issue"],
+    "Planned Stoppages": ["Changeover", "Cleaning", "Preventive Maintenance", "Meal Break"],
+    "Not Occupied": ["No Order", "Holiday"],
+}
+
+MACHINES = ["Mixer", "Filler", "Capper", "Labeller", "Case Packer", "Palletizer"]
+REASONS_PER_SUB_CATEGORY = 4
+RECLASSIFIED_SHARE = 0.15
+EQUIPMENT_RECLASSIFIED_SHARE = 0.03
+
+
+def equipment_names(n_equipment):
+    return [f"Line {i // len(MACHINES) + 1} {MACHINES[i % len(MACHINES)]}" for i in range(n_equipment)]
+
+
+def draw_categories(rng, n):
+    return rng.choice(list(CATEGORY_MIX), size=n, p=list(CATEGORY_MIX.values()))
+
+
+def draw_sub_categories(rng, categories):
+    sub_categories = np.empty(len(categories), dtype=object)
+    for category, options in SUB_CATEGORIES.items():
+        rows = np.flatnonzero(categories == category)
+        sub_categories[rows] = rng.choice(options, size=len(rows))
+    return sub_categories
+
+
+def draw_reasons(rng, sub_categories):
+    numbers = rng.integers(1, REASONS_PER_SUB_CATEGORY + 1, size=len(sub_categories)).astype(str)
+    return pd.Series(sub_categories).astype(str).str.cat(numbers, sep=" - Reason ").to_numpy()
+
+
+def generate_events(n_rows, n_equipment=30, seed=0, start="2024-01-01 06:00:00"):
+    rng = np.random.default_rng(seed)
+    equipment = np.array(equipment_names(n_equipment), dtype=object)
+    equipment_ids = np.arange(n_rows) % n_equipment
+
+    original_category = draw_categories(rng, n_rows)
+    medians = pd.Series(original_category).map(MEDIAN_SECONDS).to_numpy(dtype=float)
+    seconds = np.maximum(1, np.round(medians * rng.lognormal(0, 1, size=n_rows))).astype("int64")
+
+    # Every equipment has a back-to-back timeline, so events start where the previous one on it ended
+    offsets = pd.Series(seconds).groupby(equipment_ids).cumsum().to_numpy() - seconds
+    start_datetime = pd.Timestamp(start) + pd.to_timedelta(offsets, unit="s")
+    end_datetime = start_datetime + pd.to_timedelta(seconds, unit="s")
+
+    original_sub_category = draw_sub_categories(rng, original_category)
+    original_reason = draw_reasons(rng, original_sub_category)
+
+    # A share of events gets reclassified to a (possibly) different category, sub category and reason
+    reclassified = rng.random(n_rows) < RECLASSIFIED_SHARE
+    reclassified_category = np.where(reclassified, draw_categories(rng, n_rows), original_category)
+    reclassified_sub_category = np.where(reclassified, draw_sub_categories(rng, reclassified_category),
+                                         original_sub_category)
+    reclassified_reason = np.where(reclassified, draw_reasons(rng, reclassified_sub_category), original_reason)
+
+    moved = rng.random(n_rows) < EQUIPMENT_RECLASSIFIED_SHARE
+    reclassified_ids = np.where(moved, rng.integers(0, n_equipment, size=n_rows), equipment_ids)
+
+    plc_codes, _ = pd.factorize(original_reason, sort=True)
+
+    df = pd.DataFrame({
+        "Original Equipment": equipment[equipment_ids],
+        "Reclassified Equipment": equipment[reclassified_ids],
+        "Original Category": original_category,
+        "Reclassified Category": reclassified_category,
+        "Original Sub Category": original_sub_category,
+        "Reclassified Sub Category": reclassified_sub_category,
+        "Original Reason": original_reason,
+        "Reclassified Reason": reclassified_reason,
+        "PLC Code": plc_codes + 1000,
+        "Start Datetime": start_datetime,
+        "End Datetime": end_datetime,
+    })
+    return df.sort_values("Start Datetime", kind="stable").reset_index(drop=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic DMO event table.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--equipment", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="Output file (.xlsx, .csv or .parquet)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    df = generate_events(args.rows, args.equipment, args.seed)
+    if args.output.endswith(".parquet"):
+        df.to_parquet(args.output, index=False)
+    elif args.output.endswith(".csv"):
+        df.to_csv(args.output, index=False)
+    else:
+        df.to_excel(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
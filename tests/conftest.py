@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_cache import compact_frame
+from synthetic_data import generate_events
+
+
+@pytest.fixture(scope="session")
+def events():
+    # Loaded synthetic events with some of them dropped (gaps) and some stretched (overlaps)
+    rng = np.random.default_rng(7)
+    df = generate_events(3000, n_equipment=6, seed=3)
+    df = df[rng.random(len(df)) > 0.1].reset_index(drop=True)
+    stretched = rng.random(len(df)) < 0.05
+    df.loc[stretched, 'End Datetime'] += pd.to_timedelta(rng.integers(1, 4 * 3600, stretched.sum()), unit='s')
+    return compact_frame(df)
+
+
+@pytest.fixture(scope="session")
+def windows(events):
+    # Windows starting and ending off the hour, short and long, plus one covering everything
+    rng = np.random.default_rng(11)
+    first, last = events['Start Datetime'].min(), events['End Datetime'].max()
+    span = int((last - first).total_seconds())
+    result = [(first - pd.Timedelta(minutes=5), last + pd.Timedelta(minutes=5))]
+    for length in [1800, 5 * 3600, 3 * 86400]:
+        start = first + pd.Timedelta(seconds=int(rng.integers(0, span - length)) + 0.5)
+        result.append((start, start + pd.Timedelta(seconds=length)))
+    return result
+
+
+@pytest.fixture(scope="session")
+def workbook_bytes():
+    # Two small exports as uploaded .xlsx files
+    workbooks = []
+    for seed in [1, 2]:
+        buffer = io.BytesIO()
+        generate_events(200, n_equipment=3 + seed, seed=seed).to_excel(buffer, index=False)
+        workbooks.append(buffer.getvalue())
+    return workbooks
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    import data_cache
+    monkeypatch.setattr(data_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(data_cache, "cache_stats", {"hits": 0, "misses": 0})
+    return tmp_path / "cache"
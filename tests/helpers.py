@@ -0,0 +1,34 @@
+import numpy as np
+
+from duration_cube import CUBE_DIMENSIONS
+
+# Row-by-row versions of the vectorized filters and totals, which the tests compare against
+
+
+def brute_force_select(df, category_column, categories, start, end, equipment, clip=False):
+    # The filter FilterEngine.select implements; with clip, events overlapping the window are kept too
+    if clip:
+        in_window = (df['Start Datetime'] < end) & (df['End Datetime'] > start)
+    else:
+        in_window = (df['Start Datetime'] >= start) & (df['End Datetime'] <= end)
+    return df[in_window & df[category_column].isin(categories) &
+              df['Original Equipment'].isin(equipment) & df['Reclassified Equipment'].isin(equipment)]
+
+
+def brute_force_clip(df, start, end):
+    return df.assign(**{'Start Datetime': [max(value, start) for value in df['Start Datetime']],
+                        'End Datetime': [min(value, end) for value in df['End Datetime']]})
+
+
+def brute_force_totals(df):
+    # Seconds per combination of the cube dimensions, grouped straight from the events
+    seconds = (df['End Datetime'] - df['Start Datetime']).dt.total_seconds()
+    return (df.assign(Seconds=seconds).groupby(CUBE_DIMENSIONS, observed=True, dropna=False)['Seconds'].sum()
+            .reset_index())
+
+
+def assert_same_totals(totals, expected):
+    merged = expected.merge(totals, on=CUBE_DIMENSIONS, how='outer', suffixes=(' expected', ''), indicator=True)
+    assert len(totals) == len(expected)
+    assert (merged['_merge'] == 'both').all()
+    np.testing.assert_allclose(merged['Seconds'], merged['Seconds expected'], atol=1e-6)
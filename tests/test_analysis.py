@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from analysis import format_duration, merge_timeline_events, prepare_timeline_data, split_events
+
+
+def test_format_duration_keeps_whole_days():
+    durations = pd.Series(pd.to_timedelta([0, 59, 3600, 86399, 86400, 90061, 3 * 86400 + 7322.6], unit='s'))
+    assert format_duration(durations).tolist() == [
+        "00:00:00", "00:00:59", "01:00:00", "23:59:59", "1d 00:00:00", "1d 01:01:01", "3d 02:02:03"]
+
+
+def test_prepare_timeline_data_formats_every_event():
+    df = pd.DataFrame({column: ["x", "y"] for column in
+                       ['Original Equipment', 'Reclassified Equipment', 'Original Category', 'Original Sub Category',
+                        'Reclassified Category', 'Reclassified Sub Category', 'Reclassified Reason', 'Original Reason']})
+    df['PLC Code'] = [1, 2]
+    df['Start Datetime'] = pd.to_datetime(["2024-01-01 06:00", "2024-01-01 07:00"])
+    df['End Datetime'] = pd.to_datetime(["2024-01-01 06:30", "2024-01-03 08:00"])
+    df_plot = prepare_timeline_data(df)
+    assert df_plot['Duration'].tolist() == ["00:30:00", "2d 01:00:00"]
+    assert 'Category' in df_plot and 'Original Category' not in df_plot
+
+
+def brute_force_dominant(df_plot, window_start, window_end, pixels):
+    # Category with the most time in every (equipment, pixel column), looping over the columns one by one
+    first, last = pd.Timestamp(window_start).as_unit('ns').value, pd.Timestamp(window_end).as_unit('ns').value
+    edges = pd.DatetimeIndex(np.linspace(first, last, pixels + 1).round().astype('int64').astype('datetime64[ns]'))
+    dominant = {}
+    for equipment, group in df_plot.dropna(subset=['Category']).groupby('Original Equipment', observed=True):
+        group = group.astype({'Start Datetime': 'datetime64[ns]', 'End Datetime': 'datetime64[ns]'})
+        for pixel in range(pixels):
+            overlap = ((group['End Datetime'].clip(upper=edges[pixel + 1]) -
+                        group['Start Datetime'].clip(lower=edges[pixel])).dt.total_seconds().clip(lower=0))
+            per_category = overlap.groupby(group['Category'], observed=True, sort=False).sum()
+            if (per_category > 0).any():
+                # Any of the categories tied for the most time
+                dominant[equipment, pixel] = set(per_category.index[per_category == per_category.max()])
+    return dominant, edges
+
+
+def test_merge_timeline_events_paints_each_column_with_its_dominant_category(events):
+    df_plot = prepare_timeline_data(events)
+    window_start, window_end = df_plot['Start Datetime'].min(), df_plot['End Datetime'].max()
+    pixels = 40
+    merged = merge_timeline_events(df_plot, 'Original Equipment', 'Category', window_start, window_end, pixels)
+    expected, edges = brute_force_dominant(df_plot, window_start, window_end, pixels)
+
+    # At most one segment per equipment and pixel column, and every event counted in one of them
+    assert len(merged) <= df_plot['Original Equipment'].nunique() * pixels
+    assert merged['Events'].sum() == len(df_plot)
+    painted = {}
+    for segment in merged.itertuples(index=False):
+        start = np.searchsorted(edges, segment[2], side='right') - 1
+        end = np.searchsorted(edges, segment[3], side='left')
+        for pixel in range(start, end):
+            painted[segment[0], pixel] = segment[1]
+    assert painted.keys() == expected.keys()
+    for key, categories in expected.items():
+        assert painted[key] in categories
+
+def test_merge_timeline_events_leaves_out_events_without_a_category(events):
+    df_plot = prepare_timeline_data(events)
+    df_plot['Category'] = df_plot['Category'].astype(object)
+    df_plot.loc[1:, 'Category'] = None
+    merged = merge_timeline_events(df_plot, 'Original Equipment', 'Category',
+                                   df_plot['Start Datetime'].min(), df_plot['End Datetime'].max(), 40)
+    assert merged['Events'].sum() == 1
+    assert merged['Category'].tolist() == [df_plot['Category'].iloc[0]]
+
+
+def test_split_events_matches_overlap_with_every_bucket(events):
+    starts = events['Start Datetime'].to_numpy().astype('datetime64[ns]')
+    ends = events['End Datetime'].to_numpy().astype('datetime64[ns]')
+    # Uneven buckets that start after the first event and end before the last one
+    first = starts.min() + np.timedelta64(45, 'm')
+    edges = first + np.cumsum(np.r_[0, np.resize([3600, 5400, 1800, 7 * 3600], 60)]).astype('timedelta64[s]')
+
+    event, bucket, seconds = split_events(starts, ends, edges)
+    pieces = {(e, b): s for e, b, s in zip(event, bucket, seconds)}
+    for e in range(len(starts)):
+        for b in range(len(edges) - 1):
+            overlap = (min(ends[e], edges[b + 1]) - max(starts[e], edges[b])) / np.timedelta64(1, 's')
+            if overlap > 0:
+                assert pieces.pop((e, b)) == overlap
+    # Every other piece is empty: an event ending or starting exactly at a boundary
+    assert all(s == 0 for s in pieces.values())
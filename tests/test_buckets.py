@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from buckets import bucket_edges, bucket_totals, parse_calendar, shift_offsets
+
+
+def test_parse_calendar_reads_name_and_start():
+    assert parse_calendar(" Morning=06:00, Afternoon = 14:00,Night=22:00") == [
+        ('Morning', '06:00'), ('Afternoon', '14:00'), ('Night', '22:00')]
+
+
+@pytest.mark.parametrize("spec", ["B=6:30pm", "=06:00", "Morning", "Morning=0600", "A=06:00,,B=18:00"])
+def test_parse_calendar_rejects_malformed_shifts(spec):
+    with pytest.raises(ValueError):
+        parse_calendar(spec)
+
+
+def test_shift_offsets_are_sorted_with_their_names():
+    names, offsets = shift_offsets([('Night', '22:00'), ('Morning', '06:00'), ('Afternoon', '14:30')])
+    assert names == ['Morning', 'Afternoon', 'Night']
+    assert (offsets == np.array([6 * 60, 14 * 60 + 30, 22 * 60], dtype='timedelta64[m]')).all()
+
+
+@pytest.mark.parametrize("calendar", [[], [('A', '25:00')], [('A', '06:60')], [('A', '06:00'), ('B', '06:00')]])
+def test_shift_offsets_reject_invalid_calendars(calendar):
+    with pytest.raises(ValueError):
+        shift_offsets(calendar)
+
+
+def test_shift_edges_follow_the_calendar_across_days():
+    calendar = [('Day', '06:00'), ('Night', '18:00')]
+    edges, labels = bucket_edges("2024-01-01 03:00", "2024-01-02 07:00", 'Shift', calendar)
+    # The first production day started on the previous day's first shift
+    assert list(pd.to_datetime(edges)) == list(pd.to_datetime(
+        ["2023-12-31 06:00", "2023-12-31 18:00", "2024-01-01 06:00", "2024-01-01 18:00",
+         "2024-01-02 06:00", "2024-01-02 18:00", "2024-01-03 06:00"]))
+    assert labels == ["2023-12-31 Day", "2023-12-31 Night", "2024-01-01 Day", "2024-01-01 Night",
+                      "2024-01-02 Day", "2024-01-02 Night"]
+
+
+def test_week_edges_start_on_monday_at_the_first_shift():
+    # 2024-01-03 is a Wednesday
+    edges, labels = bucket_edges("2024-01-03 12:00", "2024-01-10 12:00", 'Week', [('Day', '06:00')])
+    assert list(pd.to_datetime(edges)) == list(pd.to_datetime(
+        ["2024-01-01 06:00", "2024-01-08 06:00", "2024-01-15 06:00"]))
+    assert labels == ["Week of 2024-01-01", "Week of 2024-01-08"]
+
+
+@pytest.mark.parametrize("granularity", ['Shift', 'Day', 'Week'])
+def test_bucket_totals_keep_every_second(events, granularity):
+    calendar = [('Shift 1', '06:00'), ('Shift 2', '14:00'), ('Shift 3', '22:00')]
+    tables = bucket_totals(events, ['Original Category', 'Reclassified Category'], granularity, calendar)
+    seconds = (events['End Datetime'] - events['Start Datetime']).dt.total_seconds()
+    for column, totals in tables.items():
+        expected = seconds.groupby(events[column], observed=True).sum()
+        np.testing.assert_allclose(totals.groupby(column, observed=True)['Seconds'].sum().reindex(expected.index),
+                                   expected)
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from charts import pareto_with_colors_figure
+
+
+@pytest.fixture
+def breakdown():
+    return pd.DataFrame({
+        'Reclassified Reason': pd.Categorical(['Jam', 'Jam', 'Changeover', 'Running', 'Other']),
+        'Reclassified Category': pd.Categorical(['Unplanned Stoppages', 'Unplanned Stoppages', 'Planned Stoppages',
+                                                 'Production Time', 'Something Else']),
+        'Duration': [1.0, 2.0, 4.0, 0.5, 0.25],
+    })
+
+
+def test_pareto_bars_take_the_colour_of_their_first_row(breakdown):
+    fig = pareto_with_colors_figure(breakdown, 'Reclassified Reason', 'Duration', 'Hours', 'Line 1',
+                                    'Reclassified Category')
+    bars = fig.data[0]
+    assert list(bars.x) == ['Changeover', 'Jam', 'Running', 'Other']
+    assert list(bars.marker.color) == ['yellow', 'red', 'green', 'blue']
+
+
+def test_pareto_colour_column_can_be_the_breakdown_column(breakdown):
+    fig = pareto_with_colors_figure(breakdown, 'Reclassified Category', 'Duration', 'Hours', 'Line 1',
+                                    'Reclassified Category')
+    bars = fig.data[0]
+    assert list(bars.x) == ['Planned Stoppages', 'Unplanned Stoppages', 'Production Time', 'Something Else']
+    assert list(bars.marker.color) == ['yellow', 'red', 'green', 'blue']
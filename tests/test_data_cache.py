@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+
+import data_cache
+
+
+def test_second_load_is_a_cache_hit(cache_dir, workbook_bytes):
+    parsed = data_cache.load_workbook(workbook_bytes[0])
+    cached = data_cache.load_workbook(workbook_bytes[0])
+    assert data_cache.cache_stats == {"hits": 1, "misses": 1}
+    assert os.path.exists(data_cache.cache_path(data_cache.file_digest(workbook_bytes[0])))
+    pd.testing.assert_frame_equal(cached, parsed)
+
+
+def test_evict_drops_least_recently_used(cache_dir, workbook_bytes):
+    for file_bytes in workbook_bytes:
+        data_cache.load_workbook(file_bytes)
+    paths = [data_cache.cache_path(data_cache.file_digest(file_bytes)) for file_bytes in workbook_bytes]
+    # The first workbook was used last, so the second one goes first
+    os.utime(paths[1], (1, 1))
+    data_cache.evict(os.path.getsize(paths[0]))
+    assert os.path.exists(paths[0]) and not os.path.exists(paths[1])
+    assert data_cache.cache_size() == (1, os.path.getsize(paths[0]))
+
+
+def test_evicted_entry_is_parsed_again(cache_dir, workbook_bytes):
+    data_cache.load_workbook(workbook_bytes[0])
+    data_cache.evict(0)
+    data_cache.load_workbook(workbook_bytes[0])
+    assert data_cache.cache_stats == {"hits": 0, "misses": 2}
+
+
+def test_combined_workbooks_share_one_dictionary_per_column_pair(cache_dir, workbook_bytes):
+    frames = [data_cache.load_workbook(file_bytes) for file_bytes in workbook_bytes]
+    combined = data_cache.combine_workbooks(frames, ["a.xlsx", "b.xlsx"])
+
+    assert len(combined) == sum(len(df) for df in frames)
+    assert combined['Source'].tolist() == ["a.xlsx"] * len(frames[0]) + ["b.xlsx"] * len(frames[1])
+    for pair in data_cache.CATEGORICAL_PAIRS:
+        dtypes = [combined[column].dtype for column in pair]
+        assert isinstance(dtypes[0], pd.CategoricalDtype) and dtypes[0] == dtypes[1]
+    # Same values as concatenating the text of the workbooks
+    for column in frames[0].columns:
+        expected = pd.concat([df[column].astype(object) for df in frames], ignore_index=True)
+        assert combined[column].astype(object).equals(expected)
+
+
+def test_load_workbooks_keeps_upload_order(cache_dir, workbook_bytes):
+    combined = data_cache.load_workbooks([("b.xlsx", workbook_bytes[1]), ("a.xlsx", workbook_bytes[0])], workers=2)
+    assert combined['Source'].cat.categories.tolist() == ["b.xlsx", "a.xlsx"]
+    assert combined['Source'].iloc[0] == "b.xlsx" and combined['Source'].iloc[-1] == "a.xlsx"
+
+
+def test_compact_frame_turns_repeated_text_into_shared_categoricals():
+    df = pd.DataFrame({
+        'Original Category': ['Production Time', 'Not Occupied'] * 50,
+        'Reclassified Category': ['Production Time', 'Planned Stoppages'] * 50,
+        'Comment': [f"note {i}" for i in range(100)],
+        'Start Datetime': pd.date_range("2024-01-01", periods=100, freq="h"),
+    })
+    df['End Datetime'] = df['Start Datetime'] + pd.Timedelta(minutes=30)
+    compact = data_cache.compact_frame(df.copy())
+
+    assert compact['Original Category'].dtype == compact['Reclassified Category'].dtype
+    assert list(compact['Original Category'].cat.categories) == ['Not Occupied', 'Planned Stoppages', 'Production Time']
+    # Mostly distinct text stays as it is
+    assert not isinstance(compact['Comment'].dtype, pd.CategoricalDtype)
+    assert (compact['Duration Seconds'] == 1800).all()
+    for column in df.columns:
+        assert compact[column].astype(object).equals(df[column].astype(object))
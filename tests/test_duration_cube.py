@@ -0,0 +1,20 @@
+import pytest
+
+from duration_cube import DurationCube
+from filter_engine import FilterEngine
+from helpers import assert_same_totals, brute_force_clip, brute_force_select, brute_force_totals
+
+
+@pytest.mark.parametrize("clip", [False, True])
+def test_slice_matches_grouped_events(events, windows, clip):
+    engine = FilterEngine(events)
+    cube = DurationCube(engine)
+    categories = ["Production Time", "Planned Stoppages", "Not Occupied"]
+    equipment = list(events['Original Equipment'].unique()[1:5])
+    for start, end in windows:
+        selection = engine.select("Reclassified Category", categories, start, end, equipment, clip)
+        totals = cube.slice("Reclassified Category", categories, start, end, equipment, selection, clip)
+        expected = brute_force_select(events, "Reclassified Category", categories, start, end, equipment, clip)
+        if clip:
+            expected = brute_force_clip(expected, start, end)
+        assert_same_totals(totals, brute_force_totals(expected))
@@ -0,0 +1,47 @@
+import pytest
+
+import event_store
+from helpers import assert_same_totals, brute_force_clip, brute_force_select, brute_force_totals
+
+
+@pytest.fixture
+def store(events, tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    half = len(events) // 2
+    assert event_store.store_workbook("first", "first.xlsx", events.iloc[:half], path)
+    assert event_store.store_workbook("second", "second.xlsx", events.iloc[half:], path)
+    # The same workbook is only stored once
+    assert not event_store.store_workbook("second", "second.xlsx", events.iloc[half:], path)
+    return path
+
+
+@pytest.mark.parametrize("clip", [False, True])
+def test_query_totals_matches_grouped_events(events, windows, store, clip):
+    categories = ["Unplanned Stoppages", "Planned Stoppages"]
+    equipment = list(events['Reclassified Equipment'].unique()[:3])
+    for start, end in windows:
+        totals = event_store.query_totals(["first", "second"], "Original Category", categories, start, end,
+                                          equipment, clip, path=store)
+        expected = brute_force_select(events, "Original Category", categories, start, end, equipment, clip)
+        if clip:
+            expected = brute_force_clip(expected, start, end)
+        assert_same_totals(totals, brute_force_totals(expected))
+
+
+@pytest.mark.parametrize("clip", [False, True])
+def test_query_events_matches_row_by_row_filter(events, windows, store, clip):
+    categories = ["Production Time", "Not Occupied"]
+    equipment = list(events['Original Equipment'].unique()[2:])
+    for start, end in windows:
+        queried = event_store.query_events(["first", "second"], "Reclassified Category", categories, start, end,
+                                           equipment, clip, path=store)
+        expected = brute_force_select(events, "Reclassified Category", categories, start, end, equipment, clip)
+        assert len(queried) == len(expected)
+        assert queried['Start Datetime'].is_monotonic_increasing
+        assert sorted(queried['End Datetime']) == sorted(expected['End Datetime'])
+        assert set(queried['Source']) <= {"first.xlsx", "second.xlsx"}
+
+
+def test_distinct_in_order_of_first_appearance(events, store):
+    for column in ["Original Category", "Reclassified Equipment"]:
+        assert event_store.distinct(["first", "second"], column, path=store) == list(events[column].dropna().unique())
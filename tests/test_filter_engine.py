@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from filter_engine import FilterEngine, clip_events
+from helpers import brute_force_clip, brute_force_select
+
+
+@pytest.mark.parametrize("clip", [False, True])
+@pytest.mark.parametrize("category_column", ["Original Category", "Reclassified Category"])
+def test_select_matches_row_by_row_filter(events, windows, category_column, clip):
+    engine = FilterEngine(events)
+    categories = ["Production Time", "Unplanned Stoppages"]
+    equipment = list(events['Original Equipment'].unique()[:4])
+    for start, end in windows:
+        selected = engine.frame(engine.select(category_column, categories, start, end, equipment, clip))
+        expected = brute_force_select(events, category_column, categories, start, end, equipment, clip)
+        expected = expected.sort_values('Start Datetime', kind='stable')
+        pd.testing.assert_frame_equal(selected.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_repeated_selection_is_memoized(events, windows):
+    engine = FilterEngine(events)
+    start, end = windows[1]
+    first = engine.select("Original Category", ["Production Time"], start, end, list(engine.equipment))
+    assert engine.select("Original Category", ["Production Time"], start, end, list(engine.equipment)) is first
+
+
+def test_clip_events_trims_to_window(events, windows):
+    engine = FilterEngine(events)
+    categories = list(engine.categories)
+    equipment = list(engine.equipment)
+    for start, end in windows:
+        selected = engine.frame(engine.select("Original Category", categories, start, end, equipment, clip=True))
+        clipped = clip_events(selected, start, end)
+        expected = brute_force_clip(selected, start, end)
+        pd.testing.assert_series_equal(clipped['Start Datetime'], expected['Start Datetime'], check_dtype=False)
+        pd.testing.assert_series_equal(clipped['End Datetime'], expected['End Datetime'], check_dtype=False)
+        assert (clipped['Duration Seconds'] ==
+                (expected['End Datetime'] - expected['Start Datetime']).dt.total_seconds()).all()
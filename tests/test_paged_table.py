@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from paged_table import page_slice, search_mask
+
+
+def brute_force_search(df, text):
+    return np.array([any(text.lower() in str(value).lower() for column, value in row.items()
+                         if not pd.api.types.is_datetime64_any_dtype(df[column].dtype))
+                     for _, row in df.iterrows()])
+
+
+def test_search_mask_matches_every_column(events):
+    df = events.head(500)
+    for text in ["filler", "STOP", "10", "no such text"]:
+        assert (search_mask(df, text) == brute_force_search(df, text)).all()
+    assert search_mask(df, "filler").any() and not search_mask(df, "no such text").any()
+
+
+def test_page_slice_pages_through_the_sorted_rows(events):
+    df = events.head(500).iloc[::-1]
+    expected = df.sort_values('Duration Seconds', ascending=False, kind='stable')
+    pages = [page_slice(df, 'Duration Seconds', ascending=False, page=page, page_size=50) for page in range(1, 11)]
+    pd.testing.assert_frame_equal(pd.concat(pages), expected)
+    # Without a sort column the original order is kept, and a page past the end is empty
+    pd.testing.assert_frame_equal(page_slice(df, page=2, page_size=25), df.iloc[25:50])
+    assert len(page_slice(df, page=21, page_size=25)) == 0
@@ -0,0 +1,35 @@
+import numpy as np
+
+from validator import VIEWS, sweep
+
+
+def brute_force_sweep(df, equipment_column, min_gap_seconds):
+    # Per equipment: walk its events in start order, keeping the latest end seen so far
+    issues, coverage = [], {}
+    for equipment, group in df.groupby(equipment_column, observed=True, sort=False):
+        group = group.sort_values('Start Datetime', kind='stable')
+        latest, covered = None, 0.0
+        for start, end in zip(group['Start Datetime'], group['End Datetime']):
+            if latest is None:
+                covered += (end - start).total_seconds()
+            else:
+                if start < latest:
+                    issues.append((equipment, 'Overlap', start, min(end, latest)))
+                elif (start - latest).total_seconds() > min_gap_seconds:
+                    issues.append((equipment, 'Gap', latest, start))
+                covered += max((end - max(start, latest)).total_seconds(), 0)
+            latest = end if latest is None else max(latest, end)
+        coverage[equipment] = covered
+    return sorted(issues), coverage
+
+
+def test_sweep_matches_walking_each_timeline(events):
+    for view in VIEWS:
+        for min_gap in [0, 300]:
+            issues, coverage = sweep(events, view, min_gap)
+            expected_issues, expected_coverage = brute_force_sweep(events, view, min_gap)
+            found = sorted(zip(issues['Equipment'], issues['Issue'], issues['Start Datetime'], issues['End Datetime']))
+            assert found == expected_issues
+            assert len(coverage) == len(expected_coverage)
+            for equipment, covered in zip(coverage['Equipment'], coverage['Covered Seconds']):
+                np.testing.assert_allclose(covered, expected_coverage[equipment])
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from analysis import comparable_values
+
+# Overlaps, gaps and coverage of each equipment's timeline, for the Original and the Reclassified view.
+# Events are sorted per equipment by start and swept once, keeping the latest end seen so far.
+
+VIEWS = ['Original Equipment', 'Reclassified Equipment']
+ISSUE_COLUMNS = ['View', 'Equipment', 'Issue', 'Start Datetime', 'End Datetime', 'Seconds']
+COVERAGE_COLUMNS = ['View', 'Equipment', 'Events', 'First Start', 'Last End', 'Covered Seconds', 'Span Seconds',
+                    'Coverage (%)', 'Overlaps', 'Overlap Seconds', 'Gaps', 'Gap Seconds']
+
+
+def sweep(df, equipment_column, min_gap_seconds=0):
+    events = df[[equipment_column, 'Start Datetime', 'End Datetime']].dropna()
+    equipment = comparable_values(events[equipment_column])
+    starts = events['Start Datetime'].to_numpy().astype('datetime64[ns]')
+    ends = events['End Datetime'].to_numpy().astype('datetime64[ns]')
+    order = np.lexsort((starts, equipment))
+    equipment, starts, ends = equipment[order], starts[order], ends[order]
+    names = events[equipment_column].array.take(order)
+
+    # Latest end among the earlier events of the same equipment (NaT for its first event)
+    latest = pd.Series(ends).groupby(equipment, sort=False).cummax().to_numpy()
+    previous = np.empty_like(latest)
+    previous[1:] = latest[:-1]
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = equipment[1:] != equipment[:-1]
+    previous[first] = np.datetime64('NaT')
+
+    overlap = ~first & (starts < previous)
+    gap = ~first & (starts - previous > np.timedelta64(int(min_gap_seconds * 1e9), 'ns'))
+    # Time each event adds to the union of the equipment's events
+    covered = np.where(first, ends - starts, np.maximum(ends - np.where(overlap, previous, starts), np.timedelta64(0, 'ns')))
+
+    issues = pd.concat([
+        pd.DataFrame({'Equipment': names[overlap], 'Issue': 'Overlap',
+                      'Start Datetime': starts[overlap], 'End Datetime': np.minimum(ends[overlap], previous[overlap])}),
+        pd.DataFrame({'Equipment': names[gap], 'Issue': 'Gap',
+                      'Start Datetime': previous[gap], 'End Datetime': starts[gap]}),
+    ], ignore_index=True)
+    issues['Seconds'] = (issues['End Datetime'] - issues['Start Datetime']).dt.total_seconds()
+    issues.insert(0, 'View', equipment_column)
+    issues = issues.sort_values(['Equipment', 'Start Datetime'], kind='stable').reset_index(drop=True)
+
+    per_event = pd.DataFrame({'Equipment': names, 'Start': starts, 'End': ends,
+                              'Covered': covered / np.timedelta64(1, 's'),
+                              'Overlap': overlap, 'Overlap Seconds': 0.0, 'Gap': gap, 'Gap Seconds': 0.0})
+    per_event.loc[overlap, 'Overlap Seconds'] = ((np.minimum(ends, previous) - starts)[overlap]) / np.timedelta64(1, 's')
+    per_event.loc[gap, 'Gap Seconds'] = ((starts - previous)[gap]) / np.timedelta64(1, 's')
+    grouped = per_event.groupby(equipment, sort=False)
+    coverage = pd.DataFrame({'Equipment': grouped['Equipment'].first(),
+                             'Events': grouped.size(),
+                             'First Start': grouped['Start'].min(),
+                             'Last End': grouped['End'].max(),
+                             'Covered Seconds': grouped['Covered'].sum(),
+                             'Overlaps': grouped['Overlap'].sum(),
+                             'Overlap Seconds': grouped['Overlap Seconds'].sum(),
+                             'Gaps': grouped['Gap'].sum(),
+                             'Gap Seconds': grouped['Gap Seconds'].sum()})
+    coverage['Span Seconds'] = (coverage['Last End'] - coverage['First Start']).dt.total_seconds()
+    coverage['Coverage (%)'] = (coverage['Covered Seconds'] / coverage['Span Seconds'] * 100).where(coverage['Span Seconds'] > 0, 100.0)
+    coverage.insert(0, 'View', equipment_column)
+    return issues, coverage[COVERAGE_COLUMNS].reset_index(drop=True)
+
+
+def validate(df, min_gap_seconds=0):
+    # Returns (issues, coverage) for both equipment views, overlaps and gaps listed per equipment in time order
+    results = [sweep(df, view, min_gap_seconds) for view in VIEWS]
+    issues = pd.concat([issues for issues, _ in results], ignore_index=True)
+    coverage = pd.concat([coverage for _, coverage in results], ignore_index=True)
+    return issues[ISSUE_COLUMNS], coverage